@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Property, Location
+from .models import Property, Location, ImageJob
 from django.contrib.auth.models import Group
 from django import forms
 
@@ -37,10 +37,16 @@ class PropertyAdminForm(forms.ModelForm):
 
 @admin.register(Location)
 class LocationAdmin(admin.ModelAdmin):
-    list_display = ("id", "location_name")
+    list_display = ("id", "location_name", "latitude", "longitude")
     search_fields = ("location_name",)
     ordering = ("location_name",)
 
+@admin.register(ImageJob)
+class ImageJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "content_type", "object_id", "field_name", "status", "attempts", "updated_at")
+    list_filter = ("status", "content_type")
+    readonly_fields = ("content_type", "object_id", "field_name", "source_name", "attempts", "error")
+
 @admin.register(Property)
 class PropertyAdmin(admin.ModelAdmin):
     form = PropertyAdminForm
@@ -58,7 +64,7 @@ class PropertyAdmin(admin.ModelAdmin):
         ("Basic Information", {
             "fields": (
                 "property_id", "property_name", "property_location",
-                "property_type", "property_subtype",
+                ("latitude", "longitude"), "property_type", "property_subtype",
             )
         }),
         ("Detailed Information", {
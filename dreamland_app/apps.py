@@ -12,3 +12,6 @@ class RealAppConfig(AppConfig):
 
     default_auto_field = "django.db.models.BigAutoField"
     name = "dreamland_app"
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
@@ -0,0 +1,70 @@
+"""
+catalogue.py - Process-local catalogue of the locations.
+
+Locations are few and rarely change, so each worker keeps all of them in
+memory, image metadata attached, instead of querying them on every page.
+The catalogue is tagged with the shared locations version from the cache;
+the signal handlers bump it when a location changes, and every worker
+reloads on its next request after that.
+
+The Location instances are shared between requests: treat them as read-only.
+"""
+
+import threading
+from collections import namedtuple
+
+from django.utils.text import slugify
+
+from .inventory import locations_version
+from .models import Location
+
+Catalogue = namedtuple("Catalogue", "version locations by_id by_slug by_name")
+
+
+class LocationCatalogue:
+
+    def __init__(self):
+        self._catalogue = None
+        self._lock = threading.Lock()
+
+    def _load(self, version):
+        locations = tuple(Location.objects.order_by("id").with_image_assets())
+        return Catalogue(
+            version,
+            locations,
+            {location.pk: location for location in locations},
+            {slugify(location.location_name): location for location in locations},
+            {location.location_name.lower(): location for location in locations},
+        )
+
+    def current(self):
+        """The catalogue for the current locations version, reloaded if stale."""
+        version = locations_version()
+        catalogue = self._catalogue
+        if catalogue is None or catalogue.version != version:
+            with self._lock:
+                catalogue = self._catalogue
+                if catalogue is None or catalogue.version != version:
+                    catalogue = self._catalogue = self._load(version)
+        return catalogue
+
+    def all(self):
+        """Every location, in the order they were added."""
+        return self.current().locations
+
+    def names(self):
+        return [location.location_name for location in self.current().locations]
+
+    def get(self, pk):
+        return self.current().by_id.get(pk)
+
+    def by_slug(self, slug):
+        """The location whose slugified name is `slug` (as linked from filterlocation.html)."""
+        return self.current().by_slug.get(slugify(slug))
+
+    def by_name(self, name):
+        """Case-insensitive exact lookup by name."""
+        return self.current().by_name.get(name.strip().lower())
+
+
+location_catalogue = LocationCatalogue()
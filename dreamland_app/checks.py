@@ -0,0 +1,44 @@
+"""
+checks.py - System checks for settings the app can't work correctly without.
+"""
+
+from django.conf import settings
+from django.core import checks
+
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Every process keeps its own cached pages, ETags, location catalogue and
+    typeahead index, and retires them when a version in the default cache
+    moves. Processes that don't share that cache never see each other's
+    bumps: the image worker's always, and other web workers' under a
+    multi-process server.
+    """
+    backend = settings.CACHES.get("default", {}).get("BACKEND")
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    hint = (
+        "Point CACHES['default'] at a cache every process shares, e.g. "
+        "FileBasedCache on a local disk or RedisCache."
+    )
+    if getattr(settings, "IMAGE_PROCESSING_ASYNC", False):
+        return [checks.Error(
+            "IMAGE_PROCESSING_ASYNC needs a cache shared between processes.",
+            hint=f"Pages cached before process_image_jobs finishes would be served stale. {hint}",
+            obj="settings.CACHES",
+            id="dreamland_app.E001",
+        )]
+    if not settings.DEBUG:
+        return [checks.Warning(
+            "The default cache is local to each process.",
+            hint=f"With more than one worker, edits made in one are not seen by the others. {hint}",
+            obj="settings.CACHES",
+            id="dreamland_app.W001",
+        )]
+    return []
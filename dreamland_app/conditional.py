@@ -0,0 +1,76 @@
+"""
+conditional.py - ETag / Last-Modified validators for the property and listing pages.
+
+Django's `condition` decorator checks them against the request's
+If-None-Match / If-Modified-Since before the view runs, so a client that
+already has the page gets a 304 without the listing query or a template
+render.
+"""
+
+import functools
+import hashlib
+import os
+
+from django.template import engines
+from django.views.decorators.http import condition
+
+from .inventory import inventory_changed_at, inventory_version
+from .models import Property
+
+
+@functools.lru_cache(maxsize=None)
+def template_version():
+    """
+    Digest of the project templates' names, sizes and modification times, so
+    a deploy that changes the markup also changes every ETag.
+    """
+    digest = hashlib.sha1()
+    for directory in engines["django"].engine.dirs:
+        for root, _, files in sorted(os.walk(directory)):
+            for name in sorted(files):
+                stat = os.stat(os.path.join(root, name))
+                digest.update(f"{root}/{name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:12]
+
+
+def _etag(*parts):
+    return hashlib.sha1(":".join(map(str, parts)).encode()).hexdigest()
+
+
+# A list page changes when a property is added, edited (possibly out of the
+# filter) or deleted, or a location renamed; the inventory version moves on
+# all of those, where the max `updated_at` of the rows shown misses deletions.
+def listing_etag(request, *args, **kwargs):
+    return _etag("listing", inventory_version(), template_version())
+
+
+def listing_last_modified(request, *args, **kwargs):
+    return inventory_changed_at()
+
+
+def _property_state(request, property_id):
+    # Both validators need the row; read it once per request.
+    if not hasattr(request, "_property_state"):
+        request._property_state = (
+            Property.objects.filter(pk=property_id)
+            .values_list("updated_at", "property_location__location_name")
+            .first()
+        )
+    return request._property_state
+
+
+def property_etag(request, property_id):
+    state = _property_state(request, property_id)
+    if state is None:
+        return None
+    updated_at, location_name = state
+    return _etag("property", property_id, updated_at.timestamp(), location_name, template_version())
+
+
+def property_last_modified(request, property_id):
+    state = _property_state(request, property_id)
+    return None if state is None else state[0]
+
+
+listing_condition = condition(etag_func=listing_etag, last_modified_func=listing_last_modified)
+property_condition = condition(etag_func=property_etag, last_modified_func=property_last_modified)
@@ -0,0 +1,190 @@
+"""
+filters.py - Parsing of the property filter form and the facet counts shown next to it.
+"""
+
+import hashlib
+import json
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .inventory import inventory_version
+from .models import (
+    LAND_SUBTYPES,
+    PLOT_AREA_SQFT_LIMIT,
+    PLOT_UNIT_SQFT,
+    PROPERTY_SUBTYPE_CHOICES,
+    PROPERTY_TYPE_CHOICES,
+    Property,
+)
+
+DEFAULT_RANGES = {
+    "min_price": 0,
+    "max_price": 10000000,
+    "min_sqft": 500,
+    "max_sqft": 5000,
+}
+
+# BHK buttons in advancedfilters.html; "5+" means more than five.
+BHK_OPTIONS = ("1", "2", "3", "4", "5", "5+")
+
+# Price bands counted for the price slider, as [low, high) in rupees; the
+# last one is open-ended.
+PRICE_BANDS = (
+    (0, 2500000),
+    (2500000, 5000000),
+    (5000000, 7500000),
+    (7500000, None),
+)
+
+FACETS_CACHE_TIMEOUT = 60 * 60
+
+
+def parse_filters(params):
+    """
+    Clean the filter form's query parameters. A malformed number resets all
+    numeric filters to their defaults; an empty or "null" bhk drops it. The
+    optional plot area range is converted to square feet.
+    """
+    filters = {
+        "location": params.get("location", "").strip(),
+        "property_type": params.get("property_type", "").strip(),
+        "property_subtype": params.get("property_subtype", "").strip(),
+        "bhk": params.get("bhk", "").strip(),
+        "property_status": params.get("property_status", "").strip(),
+    }
+    for key, default in DEFAULT_RANGES.items():
+        filters[key] = params.get(key, default)
+
+    try:
+        if filters["bhk"] and filters["bhk"].lower() != "null":
+            filters["bhk"] = filters["bhk"] if filters["bhk"] == "5+" else int(filters["bhk"])
+        else:
+            filters.pop("bhk", None)
+        for key in DEFAULT_RANGES:
+            filters[key] = int(filters[key])
+    except ValueError:
+        filters.pop("bhk", None)
+        filters.update(DEFAULT_RANGES)
+
+    unit = params.get("plot_unit", "cent")
+    for key in ("min_plot_area", "max_plot_area"):
+        if unit not in PLOT_UNIT_SQFT:
+            break
+        try:
+            area = Decimal(params.get(key, "").strip())
+            if not area.is_finite():
+                continue
+            sqft = (area * PLOT_UNIT_SQFT[unit]).quantize(Decimal("0.01"))
+        except ArithmeticError:  # InvalidOperation, Overflow, ...
+            continue
+        if abs(sqft) < PLOT_AREA_SQFT_LIMIT:
+            filters[f"{key}_sqft"] = str(sqft)
+    return filters
+
+
+def plot_area_query(filters):
+    query = Q()
+    if "min_plot_area_sqft" in filters:
+        query &= Q(plot_area_sqft__gte=filters["min_plot_area_sqft"])
+    if "max_plot_area_sqft" in filters:
+        query &= Q(plot_area_sqft__lte=filters["max_plot_area_sqft"])
+    return query
+
+
+def square_feet_query(filters):
+    return Q(square_feet__gte=filters["min_sqft"], square_feet__lte=filters["max_sqft"])
+
+
+def size_query(filters, subtype=None):
+    """
+    Land listings have a plot area instead of a built-up area, so land
+    subtypes range over `plot_area_sqft` and everything else over
+    `square_feet`. `subtype` defaults to the selected one.
+    """
+    if subtype is None:
+        subtype = filters["property_subtype"]
+    return plot_area_query(filters) if subtype in LAND_SUBTYPES else square_feet_query(filters)
+
+
+def bhk_q(bhk):
+    return Q(bhk__gt=5) if bhk == "5+" else Q(bhk=int(bhk))
+
+
+def filter_query(filters, exclude=()):
+    """
+    Q for `filters`, leaving out the facets named in `exclude`. The size range
+    depends on the subtype, so leaving out the subtype leaves it out too.
+    """
+    query = Q()
+    if filters["location"]:
+        query &= Q(property_location__location_name__icontains=filters["location"])
+    if filters["property_type"] and "property_type" not in exclude:
+        query &= Q(property_type=filters["property_type"])
+    if filters["property_subtype"] and "property_subtype" not in exclude:
+        query &= Q(property_subtype=filters["property_subtype"])
+    if filters.get("property_status"):
+        query &= Q(property_status=filters["property_status"])
+    if "bhk" in filters and "bhk" not in exclude:
+        query &= bhk_q(filters["bhk"])
+    if "price" not in exclude:
+        query &= Q(price__gte=filters["min_price"], price__lte=filters["max_price"])
+    if "property_subtype" not in exclude:
+        query &= size_query(filters)
+    return query
+
+
+def facet_counts(filters):
+    """
+    Result counts for every facet value under the current filters, in one
+    query. Each facet ignores its own filter, so the counts say what picking
+    another value would return; a subtype is counted under its own size range
+    (plot area for land, built-up area otherwise).
+    """
+    aggregates = {"total": Count("pk", filter=filter_query(filters))}
+    for value, _ in PROPERTY_TYPE_CHOICES:
+        aggregates[f"property_type:{value}"] = Count(
+            "pk", filter=filter_query(filters, exclude={"property_type"}) & Q(property_type=value)
+        )
+    for value, _ in PROPERTY_SUBTYPE_CHOICES:
+        aggregates[f"property_subtype:{value}"] = Count(
+            "pk",
+            filter=filter_query(filters, exclude={"property_subtype"})
+            & Q(property_subtype=value) & size_query(filters, value),
+        )
+    for value in BHK_OPTIONS:
+        aggregates[f"bhk:{value}"] = Count(
+            "pk", filter=filter_query(filters, exclude={"bhk"}) & bhk_q(value)
+        )
+    for low, high in PRICE_BANDS:
+        band = Q(price__gte=low) & (Q(price__lt=high) if high is not None else Q())
+        aggregates[f"price:{low}-{high or ''}"] = Count(
+            "pk", filter=filter_query(filters, exclude={"price"}) & band
+        )
+
+    # Rows that no facet could count are skipped up front.
+    base = square_feet_query(filters) | (
+        Q(property_subtype__in=LAND_SUBTYPES) & plot_area_query(filters)
+    )
+    if filters["location"]:
+        base &= Q(property_location__location_name__icontains=filters["location"])
+    counts = Property.objects.filter(base).aggregate(**aggregates)
+
+    facets = {"total": counts.pop("total")}
+    for key, count in counts.items():
+        facet, value = key.split(":", 1)
+        facets.setdefault(facet, {})[value] = count
+    return facets
+
+
+def cached_facet_counts(filters):
+    """`facet_counts`, cached per normalised filter set and inventory version."""
+    normalised = dict(filters, location=filters["location"].lower())
+    digest = hashlib.sha1(json.dumps(normalised, sort_keys=True).encode()).hexdigest()
+    key = f"facets:{inventory_version()}:{digest}"
+    facets = cache.get(key)
+    if facets is None:
+        facets = facet_counts(filters)
+        cache.set(key, facets, FACETS_CACHE_TIMEOUT)
+    return facets
@@ -0,0 +1,125 @@
+"""
+geo.py - Nearby / map-viewport search over an SQLite R*Tree index.
+
+`property_rtree` holds one point per property (rowid = property.id) at the
+property's own coordinates, or its location's when it has none. The signal
+handlers in signals.py keep it in sync. A radius search reads the bounding
+box of the circle from the index and keeps the rows whose great-circle
+distance is within the radius, nearest first.
+"""
+
+import math
+
+from django.db import connection
+
+RTREE_TABLE = "property_rtree"
+
+EARTH_RADIUS_KM = 6371.0088
+
+GEO_RESULT_LIMIT = 500
+
+# Property ids per DELETE / INSERT, so reindexing a large location never
+# builds one huge IN list.
+INDEX_BATCH_SIZE = 500
+
+INDEX_ROWS_SQL = f"""
+    INSERT INTO {RTREE_TABLE} (id, min_lat, max_lat, min_lng, max_lng)
+    SELECT p.id, lat, lat, lng, lng FROM (
+        SELECT p.id AS id,
+               COALESCE(p.latitude, l.latitude) AS lat,
+               COALESCE(p.longitude, l.longitude) AS lng
+        FROM property p LEFT JOIN location l ON l.id = p.property_location_id
+    ) AS p
+    WHERE lat IS NOT NULL AND lng IS NOT NULL
+"""
+
+
+def geo_enabled():
+    return connection.vendor == "sqlite"
+
+
+def _batches(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), INDEX_BATCH_SIZE):
+        batch = ids[start:start + INDEX_BATCH_SIZE]
+        yield batch, ", ".join(["%s"] * len(batch))
+
+
+def index_properties(ids):
+    """(Re)index the properties with these primary keys."""
+    if not geo_enabled():
+        return
+    with connection.cursor() as cursor:
+        for batch, placeholders in _batches(ids):
+            cursor.execute(f"DELETE FROM {RTREE_TABLE} WHERE id IN ({placeholders})", batch)
+            cursor.execute(f"{INDEX_ROWS_SQL} AND p.id IN ({placeholders})", batch)
+
+
+def remove_properties(ids):
+    if not geo_enabled():
+        return
+    with connection.cursor() as cursor:
+        for batch, placeholders in _batches(ids):
+            cursor.execute(f"DELETE FROM {RTREE_TABLE} WHERE id IN ({placeholders})", batch)
+
+
+def rebuild_index():
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {RTREE_TABLE}")
+        cursor.execute(INDEX_ROWS_SQL)
+
+
+def distance_km(lat1, lng1, lat2, lng2):
+    """Great-circle (haversine) distance in kilometres."""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat, lng, radius_km):
+    """(min_lat, min_lng, max_lat, max_lng) of the circle; does not wrap the antimeridian."""
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(lat))
+    delta_lng = 180.0 if cos_lat < 1e-9 else min(180.0, delta_lat / cos_lat)
+    return (
+        max(-90.0, lat - delta_lat), max(-180.0, lng - delta_lng),
+        min(90.0, lat + delta_lat), min(180.0, lng + delta_lng),
+    )
+
+
+def _points_in_box(min_lat, min_lng, max_lat, max_lng):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT id, min_lat, min_lng FROM {RTREE_TABLE} "
+            "WHERE max_lat >= %s AND min_lat <= %s AND max_lng >= %s AND min_lng <= %s",
+            [min_lat, max_lat, min_lng, max_lng],
+        )
+        return cursor.fetchall()
+
+
+def properties_near(lat, lng, radius_km, limit=GEO_RESULT_LIMIT):
+    """`[(property id, distance km)]` within `radius_km` of the point, nearest first."""
+    hits = [
+        (pk, distance_km(lat, lng, point_lat, point_lng))
+        for pk, point_lat, point_lng in _points_in_box(*bounding_box(lat, lng, radius_km))
+    ]
+    hits = [(pk, distance) for pk, distance in hits if distance <= radius_km]
+    hits.sort(key=lambda hit: (hit[1], hit[0]))
+    return hits[:limit]
+
+
+def properties_in_box(min_lat, min_lng, max_lat, max_lng, limit=GEO_RESULT_LIMIT):
+    """
+    `[(property id, distance km)]` inside the box, nearest to its centre first
+    (the order a map shows markers in when it can't show them all).
+    """
+    centre_lat, centre_lng = (min_lat + max_lat) / 2, (min_lng + max_lng) / 2
+    hits = [
+        (pk, distance_km(centre_lat, centre_lng, point_lat, point_lng))
+        for pk, point_lat, point_lng in _points_in_box(min_lat, min_lng, max_lat, max_lng)
+    ]
+    hits.sort(key=lambda hit: (hit[1], hit[0]))
+    return hits[:limit]
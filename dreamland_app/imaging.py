@@ -0,0 +1,306 @@
+"""
+imaging.py - Image processing helpers shared by the models and the image worker.
+"""
+
+import base64
+import hashlib
+import io
+import os
+import posixpath
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageCms, ImageOps
+
+from .storage import replace_file
+
+# Processed images are scaled down to this long edge before anything else runs.
+MAX_LONG_EDGE = getattr(settings, "IMAGE_MAX_LONG_EDGE", 2560)
+
+# Uploads claiming more pixels than this are rejected before being decoded.
+# Also installed as Pillow's decompression-bomb limit.
+MAX_PIXELS = getattr(settings, "IMAGE_MAX_PIXELS", 60_000_000)
+Image.MAX_IMAGE_PIXELS = MAX_PIXELS
+
+# Width of the blurred preview stored for placeholders.
+LQIP_WIDTH = 16
+
+# Rows blended per step; bounds the temporary buffers to a few MB per image.
+COMPOSITE_BAND_ROWS = 256
+
+DERIVATIVE_WIDTHS = getattr(settings, "IMAGE_DERIVATIVE_WIDTHS", (320, 640, 960, 1280))
+
+# Encoder options per derivative format, best compression first. Formats this
+# Pillow build can't encode are skipped.
+DERIVATIVE_FORMATS = getattr(settings, "IMAGE_DERIVATIVE_FORMATS", {
+    "avif": {"quality": 55},
+    "webp": {"quality": 80, "method": 4},
+})
+
+DERIVATIVE_MIME_TYPES = {"avif": "image/avif", "webp": "image/webp"}
+
+
+class WatermarkCache:
+    """
+    Process-wide cache of the watermark overlay.
+
+    The source PNG is decoded once and every overlay resized for a target size
+    is kept as a read-only RGBA NumPy array in an LRU bounded by `max_bytes`.
+    The cache is dropped whenever the source file's mtime changes, so replacing
+    the PNG takes effect without restarting the workers.
+
+    Returned arrays are shared between callers and are not writeable.
+    """
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._source = None
+        self._source_mtime = None
+        self._overlays = OrderedDict()
+        self._bytes = 0
+
+    def get(self, width):
+        """Return the overlay scaled to `width` (keeping the aspect ratio) as an array."""
+        source = self._get_source()
+        height = max(1, int(width / (source.width / source.height)))
+        key = (width, height)
+
+        with self._lock:
+            overlay = self._overlays.get(key)
+            if overlay is not None:
+                self._overlays.move_to_end(key)
+                return overlay
+
+        # Resize outside the lock so threads working on other sizes don't wait.
+        overlay = np.asarray(source.resize(key, Image.Resampling.LANCZOS))
+        overlay.flags.writeable = False
+        size = overlay.nbytes
+
+        with self._lock:
+            if source is not self._source:
+                # The PNG changed while we were resizing; don't cache stale data.
+                return overlay
+            if key not in self._overlays and size <= self.max_bytes:
+                self._overlays[key] = overlay
+                self._bytes += size
+                while self._bytes > self.max_bytes:
+                    (old_width, old_height), _ = self._overlays.popitem(last=False)
+                    self._bytes -= old_width * old_height * 4
+        return overlay
+
+    def clear(self):
+        with self._lock:
+            self._source = None
+            self._source_mtime = None
+            self._overlays.clear()
+            self._bytes = 0
+
+    def _get_source(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        with self._lock:
+            if self._source is None or mtime != self._source_mtime:
+                with Image.open(self.path) as image:
+                    self._source = image.convert("RGBA")
+                self._source_mtime = mtime
+                self._overlays.clear()
+                self._bytes = 0
+            return self._source
+
+
+watermark_cache = WatermarkCache(
+    getattr(
+        settings, "WATERMARK_PATH",
+        os.path.join(settings.BASE_DIR, "static/images/dreamslandrealtys.png"),
+    ),
+    getattr(settings, "WATERMARK_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+)
+
+
+def composite_watermark(photo, overlay):
+    """
+    Alpha-blend the RGBA `overlay` array into the centre of the RGB `photo`, in place.
+
+    Only the rows the overlay covers are touched, one band at a time, and bands
+    where the overlay is fully transparent are skipped. The arithmetic matches
+    Pillow's `paste(..., mask=overlay)`, so the output is pixel-identical to
+    compositing through a full-size RGBA canvas.
+    """
+    overlay_height, overlay_width = overlay.shape[:2]
+    left = (photo.width - overlay_width) // 2
+    top = (photo.height - overlay_height) // 2
+
+    # Clip the overlay to the photo (very wide photos get a taller overlay).
+    x0, y0 = max(left, 0), max(top, 0)
+    x1 = min(left + overlay_width, photo.width)
+    y1 = min(top + overlay_height, photo.height)
+    if x0 >= x1 or y0 >= y1:
+        return photo
+
+    for band_top in range(y0, y1, COMPOSITE_BAND_ROWS):
+        band_bottom = min(band_top + COMPOSITE_BAND_ROWS, y1)
+        band = overlay[band_top - top:band_bottom - top, x0 - left:x1 - left]
+        alpha = band[..., 3:4]
+        if not alpha.any():
+            continue
+
+        box = (x0, band_top, x1, band_bottom)
+        src = np.asarray(photo.crop(box), dtype=np.uint16)
+        alpha = alpha.astype(np.uint16)
+        # DIV255(src * (255 - a) + overlay * a), as in Pillow's paste.c; the
+        # intermediate values stay below 2**16.
+        blended = src * (255 - alpha) + band[..., :3] * alpha + 128
+        blended = ((blended >> 8) + blended) >> 8
+        photo.paste(Image.fromarray(blended.astype(np.uint8), "RGB"), box)
+    return photo
+
+
+def file_sha256(storage, name):
+    sha256 = hashlib.sha256()
+    with storage.open(name, "rb") as f:
+        for chunk in f.chunks():
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def save_image(storage, name, photo, fmt, **options):
+    """Encode `photo` in memory and store it as `name`, replacing any old copy."""
+    buffer = io.BytesIO()
+    photo.save(buffer, fmt, **options)
+    replace_file(storage, name, ContentFile(buffer.getvalue()))
+
+
+def derivative_formats():
+    Image.init()
+    return [fmt for fmt in DERIVATIVE_FORMATS if fmt.upper() in Image.SAVE]
+
+
+def derivative_path(name, width, fmt):
+    """`properties/images/a.jpg` -> `properties/images/a.640w.webp`."""
+    root, _ = posixpath.splitext(name)
+    return f"{root}.{width}w.{fmt}"
+
+
+def save_derivatives(photo, storage, name):
+    """
+    Write downscaled copies of `photo` next to the original `name` in `storage`.
+
+    Only widths smaller than the photo are generated. Returns the variants by
+    format as `[width, storage name]` pairs, narrowest first, for the
+    `responsive_image` template tag.
+    """
+    variants = {}
+    widths = sorted(width for width in DERIVATIVE_WIDTHS if width < photo.width)
+    for width in widths:
+        height = max(1, round(photo.height * width / photo.width))
+        resized = photo.resize((width, height), Image.Resampling.LANCZOS)
+        for fmt in derivative_formats():
+            save_image(storage, derivative_path(name, width, fmt), resized, fmt.upper(),
+                       **DERIVATIVE_FORMATS[fmt])
+            variants.setdefault(fmt, []).append([width, derivative_path(name, width, fmt)])
+    return variants
+
+
+def display_path(name, watermark):
+    """`properties/images/a.jpg` -> `properties/images/a.wm.jpg` (or `a.display.jpg`)."""
+    root, extension = posixpath.splitext(name)
+    return f"{root}.{'wm' if watermark else 'display'}{extension}"
+
+
+def open_image(storage, name):
+    """
+    Decode the image `name` from `storage` for processing.
+
+    The header is checked against `MAX_PIXELS` before any pixel is decoded.
+    JPEGs are decoded at a reduced DCT scale where possible (via `thumbnail`'s
+    draft mode) so the photo never exists at full resolution when it is larger
+    than `MAX_LONG_EDGE`. EXIF orientation is applied, an embedded ICC profile
+    is converted to sRGB, and all metadata is dropped. Returns the RGB image,
+    whether it was scaled down, and the source format.
+    """
+    with storage.open(name, "rb") as f, Image.open(f) as source:
+        if source.width * source.height > MAX_PIXELS:
+            raise Image.DecompressionBombError(
+                f"{source.width}x{source.height} exceeds the {MAX_PIXELS} pixel limit"
+            )
+        source_size, source_format = source.size, source.format
+        source.thumbnail((MAX_LONG_EDGE, MAX_LONG_EDGE), Image.Resampling.LANCZOS)
+        photo = ImageOps.exif_transpose(source)
+
+    icc_profile = photo.info.get("icc_profile")
+    if icc_profile and photo.mode in ("RGB", "RGBA", "CMYK"):
+        try:
+            photo = ImageCms.profileToProfile(
+                photo,
+                ImageCms.ImageCmsProfile(io.BytesIO(icc_profile)),
+                ImageCms.createProfile("sRGB"),
+                outputMode="RGB",
+            )
+        except ImageCms.PyCMSError:
+            pass
+    if photo.mode != "RGB":
+        photo = photo.convert("RGB")
+    photo.info = {}
+    return photo, max(photo.size) < max(source_size), source_format
+
+
+def describe_image(photo):
+    """
+    Return a tiny blurred preview (as a data: URI) and the dominant colour of
+    `photo`, for placeholders shown while the real image loads.
+    """
+    preview = photo.copy()
+    preview.thumbnail((LQIP_WIDTH, LQIP_WIDTH))
+    buffer = io.BytesIO()
+    lqip_format = "webp" if "webp" in derivative_formats() else "jpeg"
+    preview.save(buffer, lqip_format.upper(), quality=40)
+    lqip = f"data:image/{lqip_format};base64,{base64.b64encode(buffer.getvalue()).decode()}"
+
+    # Most frequent colour of a coarse palette; a plain average turns a blue
+    # sky over green grass into grey.
+    palette = preview.quantize(colors=5, method=Image.Quantize.MEDIANCUT)
+    _, index = max(palette.getcolors())
+    red, green, blue = palette.getpalette()[index * 3:index * 3 + 3]
+    return lqip, f"#{red:02x}{green:02x}{blue:02x}"
+
+
+def process_image_file(storage, name, watermark=False):
+    """
+    Run the image pipeline on the file `name` in `storage`.
+
+    The source file is never modified, nor served to the public (see
+    media.py): it keeps the uploader's EXIF, GPS position included. The photo
+    is decoded once, capped and stripped of metadata by `open_image`, written
+    next to the source as the display copy (watermarked when asked), and the
+    responsive derivatives are cut from the same in-memory image. Returns the metadata to record in
+    `processed_images` (the metadata keys end up on the `ImageAsset`).
+
+    The derived files keep their names when reprocessed, so the entry's
+    `revision` changes on every run; it goes into their URLs (`?v=`) to let
+    clients cache them as immutable.
+    """
+    photo, _, source_format = open_image(storage, name)
+    lqip, dominant_color = describe_image(photo)
+    entry = {
+        "format": source_format or "",
+        "bytes": storage.size(name),
+        "lqip": lqip,
+        "dominant_color": dominant_color,
+        "revision": format(time.time_ns() // 1000, "x"),
+    }
+    with photo:
+        if watermark:
+            composite_watermark(photo, watermark_cache.get(photo.width))
+        entry["display"] = display_path(name, watermark)
+        save_image(storage, entry["display"], photo, source_format or "JPEG")
+        entry.update(
+            width=photo.width,
+            height=photo.height,
+            variants=save_derivatives(photo, storage, name),
+        )
+    return entry
@@ -0,0 +1,68 @@
+"""
+inventory.py - Version numbers for the listing inventory, shared through the cache.
+
+Anything cached from listing data puts the version in its key; the signal
+handlers bump it whenever a property or location changes, which retires
+every such entry at once instead of deleting keys one by one. Locations have
+a version of their own for the per-worker location catalogue, which doesn't
+need reloading on every property edit, and so does the typeahead index,
+which only changes when a property is added or removed or a location renamed.
+"""
+
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+
+VERSION_KEY = "inventory-version"
+CHANGED_AT_KEY = "inventory-changed-at"
+LOCATIONS_VERSION_KEY = "locations-version"
+TYPEAHEAD_VERSION_KEY = "typeahead-version"
+
+
+def _version(key):
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock, not 1, so a version lost from the cache
+        # can't come back and revive entries cached under it.
+        cache.add(key, time.time_ns() // 1000, None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        return _version(key)
+
+
+def inventory_version():
+    return _version(VERSION_KEY)
+
+
+def bump_inventory_version():
+    cache.set(CHANGED_AT_KEY, time.time(), None)
+    return _bump(VERSION_KEY)
+
+
+def inventory_changed_at():
+    """When the inventory last changed, or None if the cache doesn't remember."""
+    changed_at = cache.get(CHANGED_AT_KEY)
+    return None if changed_at is None else datetime.fromtimestamp(changed_at, timezone.utc)
+
+
+def locations_version():
+    return _version(LOCATIONS_VERSION_KEY)
+
+
+def bump_locations_version():
+    return _bump(LOCATIONS_VERSION_KEY)
+
+
+def typeahead_version():
+    return _version(TYPEAHEAD_VERSION_KEY)
+
+
+def bump_typeahead_version():
+    return _bump(TYPEAHEAD_VERSION_KEY)
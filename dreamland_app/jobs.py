@@ -0,0 +1,108 @@
+"""
+jobs.py - Database-backed queue for image processing that runs outside the request.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import ImageJob
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+
+
+def enqueue_image_jobs(obj, fields):
+    """Queue one job per image field of `obj`, skipping fields already queued."""
+    content_type = ContentType.objects.get_for_model(obj)
+    pending = set(
+        ImageJob.objects.filter(
+            content_type=content_type, object_id=obj.pk, status="pending"
+        ).values_list("field_name", "source_name")
+    )
+    jobs = [
+        ImageJob(
+            content_type=content_type,
+            object_id=obj.pk,
+            field_name=field,
+            source_name=getattr(obj, field).name,
+        )
+        for field in fields
+        if (field, getattr(obj, field).name) not in pending
+    ]
+    ImageJob.objects.bulk_create(jobs)
+    return jobs
+
+
+def requeue_stale_jobs(timeout):
+    """Put jobs left in `processing` by a worker that died back on the queue."""
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    return ImageJob.objects.filter(status="processing", updated_at__lt=cutoff).update(
+        status="pending", updated_at=timezone.now()
+    )
+
+
+def claim_jobs(limit):
+    """
+    Mark up to `limit` pending jobs as processing and return them.
+
+    Each job is claimed with a conditional UPDATE, so two workers polling the
+    same queue never pick up the same job.
+    """
+    claimed = []
+    candidates = ImageJob.objects.filter(status="pending").values_list("pk", flat=True)
+    for pk in candidates[:limit]:
+        updated = ImageJob.objects.filter(pk=pk, status="pending").update(
+            status="processing", updated_at=timezone.now()
+        )
+        if updated:
+            claimed.append(pk)
+    return list(ImageJob.objects.filter(pk__in=claimed).select_related("content_type"))
+
+
+def group_jobs(jobs):
+    """Group jobs per target object so one object is never processed twice at once."""
+    groups = defaultdict(list)
+    for job in jobs:
+        groups[(job.content_type_id, job.object_id)].append(job)
+    return list(groups.values())
+
+
+def run_job_group(jobs):
+    """Process all claimed jobs of one object. Safe to call from a worker thread."""
+    try:
+        model = jobs[0].content_type.model_class()
+        obj = model.objects.filter(pk=jobs[0].object_id).first()
+        if obj is None:
+            ImageJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                status="done", error="Target no longer exists."
+            )
+            return
+
+        # A job whose file was replaced since it was queued is superseded by
+        # the job queued for the new file.
+        fields = [
+            job.field_name for job in jobs
+            if getattr(obj, job.field_name).name == job.source_name
+        ]
+        try:
+            obj.process_images(fields)
+        except Exception as exc:
+            logger.exception("Image processing failed for %s #%s", model.__name__, obj.pk)
+            for job in jobs:
+                job.attempts += 1
+                job.status = "failed" if job.attempts >= MAX_ATTEMPTS else "pending"
+                job.error = str(exc)
+                job.save(update_fields=["attempts", "status", "error", "updated_at"])
+            return
+
+        ImageJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status="done", error="", updated_at=timezone.now()
+        )
+    finally:
+        close_old_connections()
@@ -0,0 +1,246 @@
+"""
+listing_engine.py - In-memory columnar copy of the filterable Property columns.
+
+With `LISTING_ENGINE` on, `filter_properties` answers filter + sort + page
+requests from NumPy arrays (boolean masks and a lexsort) and only reads the
+final page of rows from the database, by primary key.
+
+The columns are tagged with the inventory version they reflect. Changes made
+in this process are applied in place when their transaction commits; when the
+shared version shows a change this process didn't see (another worker, a
+bulk insert, a rollback) the columns are rebuilt from the database on the
+next request.
+"""
+
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .inventory import bump_inventory_version, inventory_version
+from .models import LAND_SUBTYPES, Location, Property
+from .pagination import KeysetPage, cursor_values, decode_cursor, encode_cursor
+
+PAGE_SIZE = getattr(settings, "LISTING_PAGE_SIZE", 24)
+
+NUMERIC_COLUMNS = ("price", "square_feet", "bhk", "plot_area_sqft")
+CODED_COLUMNS = ("property_type", "property_subtype", "property_status")
+
+
+def engine_enabled():
+    return getattr(settings, "LISTING_ENGINE", False)
+
+
+class ListingColumns:
+    """
+    One immutable snapshot: rows sorted by id, NULL numbers as NaN, strings
+    as small integer codes, a missing location as -1.
+    """
+
+    def __init__(self, version, ids, columns, location_names):
+        self.version = version
+        self.ids = ids
+        self.columns = columns
+        self.location_names = location_names
+
+    def replace_row(self, pk, values):
+        """A copy with row `pk` set to `values` (a dict of column values), or removed if None."""
+        position = int(np.searchsorted(self.ids, pk))
+        exists = position < len(self.ids) and self.ids[position] == pk
+        ids, columns = self.ids, dict(self.columns)
+        if exists:
+            ids = np.delete(ids, position)
+            columns = {name: np.delete(column, position) for name, column in columns.items()}
+        if values is not None:
+            ids = np.insert(ids, position, pk)
+            columns = {
+                name: np.insert(column, position, values[name]) for name, column in columns.items()
+            }
+        return ListingColumns(self.version, ids, columns, self.location_names)
+
+
+class ListingEngine:
+    """Process-wide holder of the current `ListingColumns`."""
+
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._codes = {name: {} for name in CODED_COLUMNS}
+
+    # -- building ---------------------------------------------------------
+
+    def _code(self, column, value):
+        codes = self._codes[column]
+        return codes.setdefault(value or "", len(codes))
+
+    def _row(self, prop):
+        row = {
+            name: np.nan if getattr(prop, name) is None else float(getattr(prop, name))
+            for name in NUMERIC_COLUMNS
+        }
+        row.update({name: self._code(name, getattr(prop, name)) for name in CODED_COLUMNS})
+        row["location_id"] = prop.property_location_id if prop.property_location_id else -1
+        return row
+
+    def _build(self, version):
+        fields = ("id", "property_location_id") + NUMERIC_COLUMNS + CODED_COLUMNS
+        rows = list(Property.objects.order_by("id").values_list(*fields))
+        data = list(zip(*rows)) if rows else [()] * len(fields)
+        columns = {}
+        for name, values in zip(fields[2:], data[2:]):
+            if name in NUMERIC_COLUMNS:
+                columns[name] = np.array(
+                    [np.nan if v is None else float(v) for v in values], dtype=np.float64
+                )
+            else:
+                columns[name] = np.array([self._code(name, v) for v in values], dtype=np.int32)
+        columns["location_id"] = np.array(
+            [-1 if v is None else v for v in data[1]], dtype=np.int64
+        )
+        names = dict(Location.objects.values_list("id", "location_name"))
+        return ListingColumns(
+            version, np.array(data[0], dtype=np.int64), columns,
+            {pk: name.lower() for pk, name in names.items()},
+        )
+
+    def snapshot(self):
+        """The columns for the current inventory version, rebuilt if stale."""
+        version = inventory_version()
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != version:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None or snapshot.version != version:
+                    snapshot = self._snapshot = self._build(version)
+        return snapshot
+
+    # -- incremental updates ------------------------------------------------
+
+    def property_changed(self, instance, deleted, version):
+        """Apply a saved or deleted property once its transaction commits."""
+        if not engine_enabled():
+            return
+        pk, row = instance.pk, None if deleted else self._row(instance)
+        transaction.on_commit(lambda: self._apply(version, pk, row))
+
+    def location_changed(self, instance, deleted, version):
+        if not engine_enabled():
+            return
+        # A deleted location detaches its properties without saving them.
+        location = (instance.pk, None if deleted else instance.location_name.lower(), deleted)
+        transaction.on_commit(lambda: self._apply(version, location=location))
+
+    def version_changed(self, version):
+        """Note a version bump for a change none of the columns depend on."""
+        if engine_enabled():
+            transaction.on_commit(lambda: self._apply(version))
+
+    def retire_after_commit(self):
+        """Bump the inventory version once more after a change commits."""
+        self.version_changed(bump_inventory_version())
+
+    def _apply(self, version, pk=None, row=None, location=None):
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None:
+                return  # Not built yet.
+            if snapshot.version >= version and pk is None and location is None:
+                return  # Rebuilt since; nothing in the columns to change.
+            # A rebuild at or past `version` may have read the rows before
+            # this change committed, and the bump that follows the commit
+            # would then mark it current; rebuild instead.
+            if snapshot.version != version - 1 or (location and location[2]):
+                # Missed a change; rebuild on the next request.
+                self._snapshot = None
+                return
+            if location:
+                names = dict(snapshot.location_names)
+                names[location[0]] = location[1]
+                snapshot = ListingColumns(snapshot.version, snapshot.ids, snapshot.columns, names)
+            elif pk is not None:
+                snapshot = snapshot.replace_row(pk, row)
+            else:
+                snapshot = ListingColumns(snapshot.version, snapshot.ids, snapshot.columns, snapshot.location_names)
+            snapshot.version = version
+            self._snapshot = snapshot
+
+    # -- querying -----------------------------------------------------------
+
+    def mask(self, snapshot, filters):
+        """Boolean row mask equivalent to `filters.filter_query(filters)`."""
+        columns = snapshot.columns
+        mask = np.ones(len(snapshot.ids), dtype=bool)
+        if filters["location"]:
+            needle = filters["location"].lower()
+            matching = [pk for pk, name in snapshot.location_names.items() if needle in name]
+            mask &= np.isin(columns["location_id"], matching)
+        for name in ("property_type", "property_subtype", "property_status"):
+            if filters.get(name):
+                code = self._codes[name].get(filters[name])
+                mask &= columns[name] == (-1 if code is None else code)
+        if "bhk" in filters:
+            bhk = columns["bhk"]
+            mask &= bhk > 5 if filters["bhk"] == "5+" else bhk == int(filters["bhk"])
+        price = columns["price"]
+        mask &= (price >= filters["min_price"]) & (price <= filters["max_price"])
+        if filters["property_subtype"] in LAND_SUBTYPES:
+            plot = columns["plot_area_sqft"]
+            if "min_plot_area_sqft" in filters:
+                mask &= plot >= float(filters["min_plot_area_sqft"])
+            if "max_plot_area_sqft" in filters:
+                mask &= plot <= float(filters["max_plot_area_sqft"])
+        else:
+            sqft = columns["square_feet"]
+            mask &= (sqft >= filters["min_sqft"]) & (sqft <= filters["max_sqft"])
+        return mask
+
+    def page(self, filters, cursor=None, per_page=PAGE_SIZE):
+        """
+        The KeysetPage of properties matching `filters` in (price, id) order,
+        with the same cursors as `paginate_keyset`.
+        """
+        snapshot = self.snapshot()
+        selected = np.flatnonzero(self.mask(snapshot, filters))
+        prices = snapshot.columns["price"][selected]
+        ids = snapshot.ids[selected]
+        order = np.lexsort((ids, prices))
+        prices, ids = prices[order], ids[order]
+
+        decoded = decode_cursor(cursor, 2)
+        backwards = False
+        if decoded is None:
+            start, stop = 0, min(len(ids), per_page)
+            more = len(ids) > per_page
+        else:
+            direction, values = decoded
+            values = cursor_values(Property, ("price", "id"), values)
+            if values is None:
+                return self.page(filters, None, per_page)
+            price, pk = float(values[0]), values[1]
+            if direction == "next":
+                start = int(np.count_nonzero((prices < price) | ((prices == price) & (ids <= pk))))
+                stop = min(len(ids), start + per_page)
+                more = len(ids) - start > per_page
+            else:
+                backwards = True
+                stop = int(np.count_nonzero((prices < price) | ((prices == price) & (ids < pk))))
+                start = max(0, stop - per_page)
+                more = stop > per_page
+
+        page_ids = [int(pk) for pk in ids[start:stop]]
+        found = Property.objects.for_cards().in_bulk(page_ids)
+        rows = [found[pk] for pk in page_ids if pk in found]
+        if not rows:
+            return KeysetPage(rows)
+
+        has_next = True if backwards else more
+        has_previous = more if backwards else decoded is not None
+        return KeysetPage(
+            rows,
+            next_cursor=encode_cursor([rows[-1].price, rows[-1].id], "next") if has_next else None,
+            previous_cursor=encode_cursor([rows[0].price, rows[0].id], "prev") if has_previous else None,
+        )
+
+
+listing_engine = ListingEngine()
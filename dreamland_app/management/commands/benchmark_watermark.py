@@ -0,0 +1,130 @@
+"""
+Benchmark the watermark compositing against the previous full-canvas version.
+
+Every run happens in a fresh process so the peak RSS of one variant doesn't
+hide the other's. The reported memory is the growth of the child's peak RSS
+while it decodes, watermarks and re-encodes one photo. On Linux the peak is
+reset after the overlay is prepared, so its resize doesn't mask the result.
+"""
+
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+DEFAULT_SIZES = ["4000x3000", "5184x3888"]  # 12 MP and 20 MP phone photos
+
+
+def _legacy_composite(photo, watermark):
+    """The compositing `Property._add_watermark` used before the NumPy engine."""
+    photo = photo.convert("RGBA")
+    position = (
+        (photo.width - watermark.width) // 2,
+        (photo.height - watermark.height) // 2,
+    )
+    transparent = Image.new("RGBA", photo.size, (0, 0, 0, 0))
+    transparent.paste(photo, (0, 0))
+    transparent.paste(watermark, position, mask=watermark)
+    return transparent.convert("RGB")
+
+
+def _rss_kib(field):
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise OSError(field)
+
+
+def _reset_peak_rss():
+    """Reset the peak RSS and return the current RSS in KiB (Linux only)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+        return _rss_kib("VmRSS")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _peak_rss():
+    try:
+        return _rss_kib("VmHWM")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _run(variant, path, output):
+    from dreamland_app.imaging import composite_watermark, watermark_cache
+
+    with Image.open(path) as probe:
+        width = probe.width
+    overlay = watermark_cache.get(width)
+    legacy_overlay = Image.fromarray(overlay, "RGBA")
+    baseline = _reset_peak_rss()
+
+    start = time.perf_counter()
+    with Image.open(path) as photo:
+        if variant == "legacy":
+            _legacy_composite(photo, legacy_overlay).save(output)
+        else:
+            if photo.mode != "RGB":
+                photo = photo.convert("RGB")
+            composite_watermark(photo, overlay)
+            photo.save(output)
+    elapsed = time.perf_counter() - start
+
+    return elapsed, (_peak_rss() - baseline) * 1024
+
+
+class Command(BaseCommand):
+    help = "Compare wall time and peak RSS of the old and new watermark compositing."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "images", nargs="*",
+            help="Photos to benchmark. Synthetic photos are generated when omitted.",
+        )
+        parser.add_argument(
+            "--sizes", nargs="+", default=DEFAULT_SIZES,
+            help="WIDTHxHEIGHT of the synthetic photos (default: 12 and 20 MP).",
+        )
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per variant.")
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context("spawn")
+        with tempfile.TemporaryDirectory() as workdir:
+            images = options["images"] or [
+                self._synthetic_photo(workdir, size) for size in options["sizes"]
+            ]
+            output = os.path.join(workdir, "out.jpg")
+
+            self.stdout.write(f"{'image':<28}{'variant':<10}{'s/MP':>8}{'peak RSS MB':>14}")
+            for path in images:
+                with Image.open(path) as probe:
+                    megapixels = probe.width * probe.height / 1e6
+                for variant in ("legacy", "numpy"):
+                    times, peaks = [], []
+                    for _ in range(options["repeat"]):
+                        with context.Pool(1) as pool:
+                            elapsed, peak = pool.apply(_run, (variant, path, output))
+                        times.append(elapsed)
+                        peaks.append(peak)
+                    self.stdout.write(
+                        f"{os.path.basename(path)[:27]:<28}{variant:<10}"
+                        f"{min(times) / megapixels:>8.3f}{max(peaks) / 2**20:>14.1f}"
+                    )
+
+    def _synthetic_photo(self, workdir, size):
+        width, height = (int(value) for value in size.split("x"))
+        bands = [
+            Image.linear_gradient("L").resize((width, height)),
+            Image.effect_noise((width, height), 40),
+            Image.linear_gradient("L").rotate(90).resize((width, height)),
+        ]
+        path = os.path.join(workdir, f"synthetic_{width}x{height}.jpg")
+        Image.merge("RGB", bands).save(path, quality=90)
+        return path
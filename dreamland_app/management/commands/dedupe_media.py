@@ -0,0 +1,138 @@
+"""
+One-off migration of the existing media library to content-addressed names.
+
+Byte-identical uploads that Django stored under random suffixes
+(`a.jpg`, `a_Ap2Ih07.jpg`, ...) are collapsed into one `<sha256>.<ext>` blob
+per upload directory; every Property/Location pointing at a duplicate is
+repointed to it and the redundant files are deleted.
+"""
+
+import posixpath
+import re
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from dreamland_app.models import Location, Property, touched
+from dreamland_app.imaging import file_sha256
+from dreamland_app.inventory import bump_inventory_version, bump_locations_version
+from dreamland_app.storage import image_storage
+
+# Files written by the image pipeline next to a source image.
+DERIVED_NAME = re.compile(r"\.(\d+w|wm|display)\.\w+$")
+
+
+class Command(BaseCommand):
+    help = "Collapse byte-identical images into content-addressed files."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Report what would change without touching files or rows.",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        references = self._collect_references()
+        directories = sorted({
+            posixpath.normpath(model._meta.get_field(field).upload_to)
+            for model in (Property, Location)
+            for field in model.image_fields
+        })
+
+        duplicates, blobs, repointed, written = [], 0, 0, 0
+        for directory in directories:
+            for digest, names in self._group_by_content(directory).items():
+                extension = posixpath.splitext(sorted(names)[0])[1].lower()
+                canonical = posixpath.join(directory, digest + extension)
+                if names == [canonical]:
+                    continue
+                blobs += 1
+                if canonical not in names:
+                    written += image_storage.size(names[0])
+                    if not dry_run:
+                        with image_storage.open(names[0]) as source:
+                            image_storage.save(canonical, source)
+                for name in names:
+                    if name == canonical:
+                        continue
+                    duplicates.append(name)
+                    for obj, field in references.pop(name, []):
+                        repointed += 1
+                        self._repoint(obj, field, canonical, dry_run)
+                        references.setdefault(canonical, []).append((obj, field))
+
+        freed = self._delete(duplicates, references, dry_run) - written
+        if repointed and not dry_run:
+            # Cached pages and the per-worker location catalogue still point
+            # at the deleted duplicates; update() sends no signals.
+            bump_inventory_version()
+            bump_locations_version()
+        verb = "Would collapse" if dry_run else "Collapsed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {len(duplicates)} file(s) into {blobs} content-addressed blob(s), "
+            f"freeing {freed / 2**20:.1f} MB; repointed {repointed} image field(s)."
+        ))
+
+    def _collect_references(self):
+        references = defaultdict(list)
+        for model in (Property, Location):
+            for obj in model.objects.only("pk", "processed_images", *model.image_fields):
+                for field in model.image_fields:
+                    name = getattr(obj, field).name
+                    if name:
+                        references[name].append((obj, field))
+        return references
+
+    def _group_by_content(self, directory):
+        groups = defaultdict(list)
+        if not image_storage.exists(directory):
+            return groups
+        for filename in image_storage.listdir(directory)[1]:
+            if DERIVED_NAME.search(filename):
+                continue
+            name = posixpath.join(directory, filename)
+            groups[file_sha256(image_storage, name)].append(name)
+        return groups
+
+    def _repoint(self, obj, field, canonical, dry_run):
+        self.stdout.write(f"{obj._meta.model_name} #{obj.pk} {field}: {getattr(obj, field).name} -> {canonical}")
+        setattr(obj, field, canonical)
+        if field in obj.processed_images:
+            obj.processed_images[field]["name"] = canonical
+        if not dry_run:
+            type(obj).objects.filter(pk=obj.pk).update(
+                **touched(type(obj), **{field: canonical, "processed_images": obj.processed_images})
+            )
+
+    def _delete(self, duplicates, references, dry_run):
+        """Delete the duplicates and their derived files nothing refers to any more."""
+        still_used = {
+            name
+            for entries in references.values()
+            for obj, field in entries
+            for name in _derived_names(obj.processed_images.get(field, {}))
+        }
+        freed = 0
+        for name in duplicates:
+            directory, filename = posixpath.split(name)
+            root = posixpath.splitext(filename)[0]
+            derived = [
+                posixpath.join(directory, other)
+                for other in image_storage.listdir(directory)[1]
+                if other.startswith(root + ".") and DERIVED_NAME.search(other)
+            ]
+            for victim in [name] + derived:
+                if victim in still_used:
+                    continue
+                freed += image_storage.size(victim)
+                if not dry_run:
+                    image_storage.delete(victim)
+        return freed
+
+
+def _derived_names(entry):
+    names = [name for variants in entry.get("variants", {}).values() for _, name in variants]
+    if entry.get("display"):
+        names.append(entry["display"])
+    return names
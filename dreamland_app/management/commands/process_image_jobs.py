@@ -0,0 +1,58 @@
+"""
+Worker that drains the image job queue with a thread pool.
+
+Pillow releases the GIL while decoding, resizing and encoding, so threads give
+real parallelism here without the memory cost of a process per worker.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from dreamland_app.jobs import claim_jobs, group_jobs, requeue_stale_jobs, run_job_group
+
+
+class Command(BaseCommand):
+    help = "Process queued image jobs (watermarks and derivatives) in the background."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count() or 1,
+            help="Number of worker threads (default: number of CPUs).",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=50,
+            help="Maximum number of jobs claimed per poll.",
+        )
+        parser.add_argument(
+            "--poll-interval", type=float, default=2.0,
+            help="Seconds to sleep when the queue is empty.",
+        )
+        parser.add_argument(
+            "--stale-timeout", type=int, default=600,
+            help="Seconds after which a job stuck in 'processing' is queued again.",
+        )
+        parser.add_argument(
+            "--once", action="store_true",
+            help="Drain the queue once and exit instead of polling forever.",
+        )
+
+    def handle(self, *args, **options):
+        processed = 0
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            # A single worker runs jobs on the main thread (and its connection).
+            run = pool.map if options["workers"] > 1 else map
+            while True:
+                requeue_stale_jobs(options["stale_timeout"])
+                jobs = claim_jobs(options["batch_size"])
+                if jobs:
+                    list(run(run_job_group, group_jobs(jobs)))
+                    processed += len(jobs)
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["poll_interval"])
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} image job(s)."))
@@ -0,0 +1,21 @@
+"""
+Refill the full-text and spatial search indexes from the property table.
+
+The index is kept current on save/delete; this is for bulk imports and for
+recovering after rows were changed behind the ORM's back.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dreamland_app import geo, search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the SQLite FTS5 and R*Tree indexes used by property search."
+
+    def handle(self, *args, **options):
+        if not search.search_enabled():
+            raise CommandError("Full-text search needs the SQLite database backend.")
+        search.rebuild_index()
+        geo.rebuild_index()
+        self.stdout.write(self.style.SUCCESS("Search indexes rebuilt."))
@@ -0,0 +1,166 @@
+"""
+media.py - Serving of uploaded files under MEDIA_URL, outside DEBUG as well.
+
+A URL that can't change content is sent with a one-year `immutable`
+Cache-Control. That covers content-addressed originals (`<sha256>.<ext>`)
+and derived files requested with their `?v=` revision. Anything else is
+cached briefly and revalidated. Conditional requests and single byte ranges
+are answered here. With `MEDIA_SERVE_MODE` set to "x-accel-redirect" (nginx)
+or "x-sendfile" (Apache, lighttpd), the transfer itself is handed to the
+front proxy, so no worker streams image bytes.
+
+Uploaded photos themselves are never public: they carry the uploader's EXIF
+(GPS position included) and lack the watermark. Only the files the image
+pipeline derives from them are served; staff may still open the sources.
+"""
+
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+MEDIA_SERVE_MODE = getattr(settings, "MEDIA_SERVE_MODE", "django")
+MEDIA_ACCEL_PREFIX = getattr(settings, "MEDIA_ACCEL_PREFIX", "/protected-media/")
+MEDIA_MAX_AGE = getattr(settings, "MEDIA_MAX_AGE", 60 * 60)
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+CHUNK_SIZE = 64 * 1024
+
+# Directories the image fields upload to, and the names of the files the
+# pipeline writes next to each source (see imaging.py).
+SOURCE_IMAGE_DIRS = tuple(getattr(
+    settings, "MEDIA_SOURCE_IMAGE_DIRS", ("properties/images/", "locations/images/")
+))
+DERIVED_IMAGE_NAME = re.compile(r"\.(?:wm|display|\d+w)\.\w+$")
+
+CONTENT_ADDRESSED_NAME = re.compile(r"^[0-9a-f]{64}\.\w+$")
+BYTE_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def media_file_path(path):
+    """Absolute path of the file `path` under MEDIA_ROOT; Http404 if there is none."""
+    root = os.path.realpath(settings.MEDIA_ROOT)
+    full_path = os.path.realpath(os.path.join(root, path))
+    if not full_path.startswith(root + os.sep) or not os.path.isfile(full_path):
+        raise Http404("Media file not found.")
+    return full_path
+
+
+def media_name(full_path):
+    """`full_path` as a storage name relative to MEDIA_ROOT, with `/` separators."""
+    relative = os.path.relpath(full_path, os.path.realpath(settings.MEDIA_ROOT))
+    return relative.replace(os.sep, "/")
+
+
+def is_source_image(path):
+    """
+    True for an uploaded photo (as opposed to a file derived from one).
+    `path` must be normalised (see `media_name`).
+    """
+    return path.startswith(SOURCE_IMAGE_DIRS) and not DERIVED_IMAGE_NAME.search(path)
+
+
+def cache_control(request, path):
+    scope = "private" if is_source_image(path) else "public"
+    if CONTENT_ADDRESSED_NAME.match(os.path.basename(path)) or "v" in request.GET:
+        return f"{scope}, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    return f"{scope}, max-age={MEDIA_MAX_AGE}"
+
+
+def parse_range(header, size):
+    """
+    `(start, stop)` of a single `bytes=` range in a file of `size` bytes, with
+    start >= stop when it can't be satisfied; None to send the whole file
+    (no range, a malformed one, or several, which are allowed to be ignored).
+    """
+    match = BYTE_RANGE.match(header.strip())
+    if match is None or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        suffix = int(last)
+        return (max(0, size - suffix), size) if suffix else (size, size)
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    return start, min(size, int(last) + 1) if last else size
+
+
+def _read_range(full_path, start, length):
+    with open(full_path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _file_response(request, path, full_path, size, validators, content_type):
+    if MEDIA_SERVE_MODE == "x-accel-redirect":
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = MEDIA_ACCEL_PREFIX + quote(path)
+        return response
+    if MEDIA_SERVE_MODE == "x-sendfile":
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = full_path
+        return response
+
+    byte_range = None
+    if_range = request.headers.get("If-Range")
+    if if_range is None or if_range in validators:
+        byte_range = parse_range(request.headers.get("Range", ""), size)
+    start, stop = byte_range or (0, size)
+    if start >= stop and byte_range is not None:
+        response = HttpResponse(status=416, content_type=content_type)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    if request.method == "HEAD":
+        response = HttpResponse(content_type=content_type)
+    elif byte_range is None:
+        response = FileResponse(open(full_path, "rb"), content_type=content_type)
+    else:
+        response = StreamingHttpResponse(
+            _read_range(full_path, start, stop - start), content_type=content_type
+        )
+    if byte_range is not None:
+        response.status_code = 206
+        response["Content-Range"] = f"bytes {start}-{stop - 1}/{size}"
+    response["Content-Length"] = stop - start
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """Send the media file `path`, or hand it to the front proxy."""
+    full_path = media_file_path(path)
+    # Check the resolved name: `a//b`, `./a/b` and `c/../a/b` all reach `a/b`.
+    path = media_name(full_path)
+    if is_source_image(path) and not request.user.is_staff:
+        raise Http404("Media file not found.")
+    stat = os.stat(full_path)
+    etag = quote_etag(f"{stat.st_mtime_ns:x}-{stat.st_size:x}")
+    last_modified = int(stat.st_mtime)
+    content_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _file_response(
+            request, path, full_path, stat.st_size,
+            (etag, http_date(last_modified)), content_type,
+        )
+    if response.status_code in (200, 206, 304):
+        response["Cache-Control"] = cache_control(request, path)
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+    return response
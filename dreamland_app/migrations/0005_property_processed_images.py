@@ -0,0 +1,57 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:03
+
+import hashlib
+import os
+
+from django.conf import settings
+from django.db import migrations, models
+
+IMAGE_FIELDS = ("property_main_image", "gallery_1", "gallery_2", "gallery_3")
+
+
+def mark_existing_images(apps, schema_editor):
+    """
+    Every image saved before this migration has been watermarked at least once,
+    so record them as processed instead of stamping them again on the next save.
+    """
+    Property = apps.get_model("dreamland_app", "Property")
+    for prop in Property.objects.all():
+        processed = {}
+        for field in IMAGE_FIELDS:
+            name = getattr(prop, field).name
+            if not name:
+                continue
+            path = os.path.join(settings.MEDIA_ROOT, name)
+            digest = None
+            if os.path.exists(path):
+                sha256 = hashlib.sha256()
+                with open(path, "rb") as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                        sha256.update(chunk)
+                digest = sha256.hexdigest()
+            processed[field] = {"name": name, "sha256": digest}
+        Property.objects.filter(pk=prop.pk).update(processed_images=processed)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            "dreamland_app",
+            "0004_location_remove_property_acre_remove_property_cent_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="property",
+            name="processed_images",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                help_text="Per image field: the file name and SHA-256 of the watermarked file.",
+            ),
+        ),
+        migrations.RunPython(mark_existing_images, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dreamland_app", "0006_imagejob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="location",
+            name="processed_images",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                help_text="Per image field: the file name, SHA-256 and derivatives of the processed file.",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="property",
+            name="processed_images",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                help_text="Per image field: the file name, SHA-256 and derivatives of the processed file.",
+            ),
+        ),
+    ]
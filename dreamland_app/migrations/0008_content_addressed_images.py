@@ -0,0 +1,105 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:09
+
+import dreamland_app.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dreamland_app", "0007_location_processed_images"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImageAsset",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255, unique=True)),
+                ("sha256", models.CharField(db_index=True, max_length=64)),
+                ("entry", models.JSONField(default=dict)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "db_table": "image_asset",
+            },
+        ),
+        migrations.AlterField(
+            model_name="location",
+            name="location_image",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=dreamland_app.storage.get_image_storage,
+                upload_to="locations/images/",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="location",
+            name="processed_images",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                help_text="Per image field: the source file name and SHA-256, and the files derived from it.",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="property",
+            name="gallery_1",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=dreamland_app.storage.get_image_storage,
+                upload_to="properties/images/gallery/",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="property",
+            name="gallery_2",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=dreamland_app.storage.get_image_storage,
+                upload_to="properties/images/gallery/",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="property",
+            name="gallery_3",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=dreamland_app.storage.get_image_storage,
+                upload_to="properties/images/gallery/",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="property",
+            name="processed_images",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                help_text="Per image field: the source file name and SHA-256, and the files derived from it.",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="property",
+            name="property_main_image",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=dreamland_app.storage.get_image_storage,
+                upload_to="properties/images",
+            ),
+        ),
+    ]
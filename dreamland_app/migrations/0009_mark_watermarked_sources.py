@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+def mark_watermarked_sources(apps, schema_editor):
+    """
+    Property images marked processed by 0005 were watermarked in place, so their
+    source file already carries the watermark. Flag them so reprocessing only
+    rebuilds their derivatives. Entries written by the pipeline always have a
+    width; the ones from 0005 don't.
+    """
+    Property = apps.get_model("dreamland_app", "Property")
+    for prop in Property.objects.exclude(processed_images={}):
+        processed = prop.processed_images
+        for entry in processed.values():
+            if "width" not in entry:
+                entry["source_watermarked"] = True
+        Property.objects.filter(pk=prop.pk).update(processed_images=processed)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dreamland_app", "0008_content_addressed_images"),
+    ]
+
+    operations = [
+        migrations.RunPython(mark_watermarked_sources, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:12
+
+import dreamland_app.storage
+import dreamland_app.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dreamland_app", "0009_mark_watermarked_sources"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="location",
+            name="location_image",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=dreamland_app.storage.get_image_storage,
+                upload_to="locations/images/",
+                validators=[dreamland_app.validators.validate_image_dimensions],
+            ),
+        ),
+        migrations.AlterField(
+            model_name="property",
+            name="gallery_1",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=dreamland_app.storage.get_image_storage,
+                upload_to="properties/images/gallery/",
+                validators=[dreamland_app.validators.validate_image_dimensions],
+            ),
+        ),
+        migrations.AlterField(
+            model_name="property",
+            name="gallery_2",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=dreamland_app.storage.get_image_storage,
+                upload_to="properties/images/gallery/",
+                validators=[dreamland_app.validators.validate_image_dimensions],
+            ),
+        ),
+        migrations.AlterField(
+            model_name="property",
+            name="gallery_3",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=dreamland_app.storage.get_image_storage,
+                upload_to="properties/images/gallery/",
+                validators=[dreamland_app.validators.validate_image_dimensions],
+            ),
+        ),
+        migrations.AlterField(
+            model_name="property",
+            name="property_main_image",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=dreamland_app.storage.get_image_storage,
+                upload_to="properties/images",
+                validators=[dreamland_app.validators.validate_image_dimensions],
+            ),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dreamland_app", "0010_image_dimension_validators"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="imageasset",
+            name="bytes",
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="imageasset",
+            name="dominant_color",
+            field=models.CharField(blank=True, default="", max_length=7),
+        ),
+        migrations.AddField(
+            model_name="imageasset",
+            name="format",
+            field=models.CharField(blank=True, default="", max_length=10),
+        ),
+        migrations.AddField(
+            model_name="imageasset",
+            name="height",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="imageasset",
+            name="lqip",
+            field=models.TextField(
+                blank=True, default="", help_text="Tiny blurred preview as a data: URI."
+            ),
+        ),
+        migrations.AddField(
+            model_name="imageasset",
+            name="width",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
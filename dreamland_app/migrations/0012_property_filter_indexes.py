@@ -0,0 +1,37 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dreamland_app", "0011_image_asset_metadata"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="property",
+            index=models.Index(fields=["price", "id"], name="property_price_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="property",
+            index=models.Index(
+                fields=["property_type", "price"], name="property_type_price_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="property",
+            index=models.Index(
+                fields=["property_type", "property_subtype", "price"],
+                name="property_subtype_price_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="property",
+            index=models.Index(
+                fields=["property_type", "property_subtype", "bhk", "price"],
+                name="property_bhk_price_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+CREATE_SQL = """
+CREATE VIRTUAL TABLE property_fts USING fts5(
+    property_id, property_name, short_description, property_description, location_name,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+FILL_SQL = """
+INSERT INTO property_fts (rowid, property_id, property_name, short_description,
+                          property_description, location_name)
+SELECT p.id,
+       COALESCE(p.property_id, '') || ' ' || COALESCE(SUBSTR(p.property_id, 3), ''),
+       p.property_name, COALESCE(p.short_description, ''), p.property_description,
+       COALESCE(l.location_name, '')
+FROM property p LEFT JOIN location l ON l.id = p.property_location_id
+"""
+
+
+def create_index(apps, schema_editor):
+    """Full-text search is SQLite-only; other databases fall back to LIKE."""
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(CREATE_SQL)
+    schema_editor.execute(FILL_SQL)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS property_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dreamland_app", "0012_property_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
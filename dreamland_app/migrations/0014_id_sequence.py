@@ -0,0 +1,39 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:25
+
+from django.db import migrations, models
+
+
+def seed_property_ids(apps, schema_editor):
+    """Continue after the highest DLxxxx handed out by the old Max(id) scheme."""
+    Property = apps.get_model("dreamland_app", "Property")
+    IdSequence = apps.get_model("dreamland_app", "IdSequence")
+    last_id = Property.objects.order_by("-id").values_list("id", flat=True).first() or 0
+    next_value = 1000 + last_id
+    for property_id in Property.objects.exclude(property_id=None).values_list("property_id", flat=True):
+        if property_id[2:].isdigit():
+            next_value = max(next_value, int(property_id[2:]) + 1)
+    IdSequence.objects.create(name="property_id", next_value=next_value)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dreamland_app", "0013_property_fts"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IdSequence",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=50, primary_key=True, serialize=False),
+                ),
+                ("next_value", models.BigIntegerField()),
+            ],
+            options={
+                "db_table": "id_sequence",
+            },
+        ),
+        migrations.RunPython(seed_property_ids, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:26
+
+import re
+from decimal import Decimal
+
+from django.db import migrations, models
+
+PLOT_UNIT_SQFT = {"cent": Decimal("435.6"), "acre": Decimal("43560")}
+PLOT_AREA_NUMBER = re.compile(r"\d[\d,]*(?:\.\d+)?|\.\d+")
+
+
+def plot_area_to_sqft(plot_area, plot_unit):
+    """Frozen copy of models.plot_area_to_sqft."""
+    match = PLOT_AREA_NUMBER.search(plot_area or "")
+    unit = plot_unit or next(
+        (unit for unit in ("acre", "cent") if unit in (plot_area or "").lower()), None
+    )
+    if match is None or unit not in PLOT_UNIT_SQFT:
+        return None
+    area = Decimal(match.group().replace(",", ""))
+    return (area * PLOT_UNIT_SQFT[unit]).quantize(Decimal("0.01"))
+
+
+def backfill_plot_area_sqft(apps, schema_editor):
+    Property = apps.get_model("dreamland_app", "Property")
+    for prop in Property.objects.only("plot_area", "plot_unit"):
+        sqft = plot_area_to_sqft(prop.plot_area, prop.plot_unit)
+        if sqft is not None:
+            Property.objects.filter(pk=prop.pk).update(plot_area_sqft=sqft)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dreamland_app", "0014_id_sequence"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="property",
+            name="plot_area_sqft",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                editable=False,
+                help_text="Plot area converted to square feet, for range filters.",
+                max_digits=14,
+                null=True,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="property",
+            index=models.Index(
+                fields=["property_type", "property_subtype", "plot_area_sqft"],
+                name="property_plot_area_idx",
+            ),
+        ),
+        migrations.RunPython(backfill_plot_area_sqft, migrations.RunPython.noop),
+    ]
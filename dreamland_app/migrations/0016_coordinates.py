@@ -0,0 +1,53 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:27
+
+from django.db import migrations, models
+
+CREATE_SQL = """
+CREATE VIRTUAL TABLE property_rtree USING rtree(id, min_lat, max_lat, min_lng, max_lng)
+"""
+
+
+def create_spatial_index(apps, schema_editor):
+    """The R*Tree index is SQLite-only; nearby search is disabled elsewhere."""
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(CREATE_SQL)
+
+
+def drop_spatial_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS property_rtree")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dreamland_app", "0015_property_plot_area_sqft"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="location",
+            name="latitude",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="location",
+            name="longitude",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="property",
+            name="latitude",
+            field=models.FloatField(
+                blank=True,
+                help_text="Leave empty to use the location's coordinates.",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="property",
+            name="longitude",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunPython(create_spatial_index, drop_spatial_index),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dreamland_app", "0016_coordinates"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="property",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
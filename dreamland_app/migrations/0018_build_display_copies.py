@@ -0,0 +1,80 @@
+from django.db import migrations
+from django.utils import timezone
+from PIL import Image
+
+# (model, image fields, watermarked) as of this migration.
+IMAGE_MODELS = (
+    ("Property", ("property_main_image", "gallery_1", "gallery_2", "gallery_3"), True),
+    ("Location", ("location_image",), False),
+)
+
+# Pipeline output kept on the ImageAsset row only, as in ImageAsset.record().
+METADATA_KEYS = ("format", "bytes", "lqip", "dominant_color")
+
+
+def build_display_copies(apps, schema_editor):
+    """
+    Uploaded originals are no longer served to the public (see media.py), so
+    every image needs a display copy before the site goes live. Build the
+    missing ones here instead of leaving broken images until someone runs
+    `reprocess_images`. Sources flagged by 0009 already carry the watermark
+    and are not watermarked again. Missing or unreadable files are skipped.
+    """
+    from dreamland_app.imaging import file_sha256, process_image_file
+    from dreamland_app.inventory import bump_inventory_version, bump_locations_version
+    from dreamland_app.storage import image_storage
+
+    ImageAsset = apps.get_model("dreamland_app", "ImageAsset")
+    changed = False
+    for model_name, fields, watermark in IMAGE_MODELS:
+        model = apps.get_model("dreamland_app", model_name)
+        has_updated_at = any(field.name == "updated_at" for field in model._meta.concrete_fields)
+        for obj in model.objects.all():
+            processed = dict(obj.processed_images)
+            for field in fields:
+                name = getattr(obj, field).name
+                previous = processed.get(field, {})
+                if not name or previous.get("display") or not image_storage.exists(name):
+                    continue
+                legacy = bool(previous.get("source_watermarked"))
+                asset = ImageAsset.objects.filter(name=name).first()
+                if asset is not None and asset.entry.get("display") and not legacy:
+                    processed[field] = dict(asset.entry, name=name)
+                    continue
+                try:
+                    entry = process_image_file(image_storage, name, watermark=watermark and not legacy)
+                except (OSError, ValueError, Image.DecompressionBombError):
+                    continue
+                sha256 = file_sha256(image_storage, name)
+                metadata = {key: entry.pop(key) for key in METADATA_KEYS if key in entry}
+                entry.update(name=name, sha256=sha256)
+                ImageAsset.objects.update_or_create(
+                    name=name,
+                    defaults=dict(
+                        sha256=sha256, entry=entry,
+                        width=entry.get("width"), height=entry.get("height"), **metadata
+                    ),
+                )
+                processed[field] = dict(entry, **({"source_watermarked": True} if legacy else {}))
+            if processed != obj.processed_images:
+                values = {"processed_images": processed}
+                if has_updated_at:
+                    values["updated_at"] = timezone.now()
+                model.objects.filter(pk=obj.pk).update(**values)
+                changed = True
+
+    if changed:
+        # Pages and the location catalogue cached before still show the sources.
+        bump_inventory_version()
+        bump_locations_version()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dreamland_app", "0017_property_updated_at"),
+    ]
+
+    operations = [
+        migrations.RunPython(build_display_copies, migrations.RunPython.noop),
+    ]
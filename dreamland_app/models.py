@@ -1,10 +1,19 @@
-import os
+import re
 from datetime import date
-from PIL import Image, ImageDraw, ImageFont, ImageEnhance
-from django.db import models
-from django.db.models import Max
+from decimal import Decimal
+from django.db import models, transaction
 from django.conf import settings
-from django.core.files.storage import default_storage
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+from django.utils import timezone
+
+from . import geo, search
+from .imaging import file_sha256, process_image_file
+from .inventory import bump_inventory_version, bump_locations_version
+from .sequences import property_ids
+from .storage import get_image_storage
+from .typeahead import typeahead_index
+from .validators import validate_image_dimensions
 
 STATUS_CHOICES = [
     ("available", "Available"),
@@ -30,17 +39,343 @@ PROPERTY_SUBTYPE_CHOICES = [
     ("commercial_others", "Commercial Other"),
 ]
 
+JOB_STATUS_CHOICES = [
+    ("pending", "Pending"),
+    ("processing", "Processing"),
+    ("done", "Done"),
+    ("failed", "Failed"),
+]
+
+IMAGE_FIELDS = ("property_main_image", "gallery_1", "gallery_2", "gallery_3")
+
 PLOT_UNIT_CHOICES = [
     ("cent", "Cent"),
     ("acre", "Acre"),
 ]
 
-class Location(models.Model):
+# Square feet per plot unit; plot areas are stored in square feet as well.
+PLOT_UNIT_SQFT = {
+    "sqft": Decimal("1"),
+    "cent": Decimal("435.6"),
+    "acre": Decimal("43560"),
+}
+
+LAND_SUBTYPES = ("residential_land", "commercial_land")
+
+PLOT_AREA_NUMBER = re.compile(r"\d[\d,]*(?:\.\d+)?|\.\d+")
+
+# Bounds of `plot_area_sqft` (max_digits=14, decimal_places=2); an area
+# outside them can't be stored or compared against the column.
+PLOT_AREA_SQFT_LIMIT = Decimal(10) ** 12
+
+
+def plot_area_to_sqft(plot_area, plot_unit):
+    """
+    Square feet of a free-text plot area ("12", "1,200", "2.5 acres") in
+    `plot_unit`, or None when it has no number, no known unit or doesn't
+    fit `plot_area_sqft`.
+    """
+    match = PLOT_AREA_NUMBER.search(plot_area or "")
+    unit = plot_unit or next(
+        (unit for unit in ("acre", "cent") if unit in (plot_area or "").lower()), None
+    )
+    if match is None or unit not in PLOT_UNIT_SQFT:
+        return None
+    try:
+        area = Decimal(match.group().replace(",", ""))
+        sqft = (area * PLOT_UNIT_SQFT[unit]).quantize(Decimal("0.01"))
+    except ArithmeticError:  # InvalidOperation, Overflow, ...
+        return None
+    return sqft if sqft < PLOT_AREA_SQFT_LIMIT else None
+
+# Everything a property card renders; see PropertyQuerySet.for_cards().
+CARD_FIELDS = (
+    "id", "property_id", "property_name", "bhk", "square_feet", "property_status",
+    "short_description", "property_main_image", "processed_images", "price",
+    "property_type", "property_subtype", "plot_area", "plot_unit",
+    "updated_at", "property_location__location_name",
+)
+
+class ProcessedImagesQuerySet(models.QuerySet):
+    """QuerySet for models with processed images."""
+
+    _with_image_assets = False
+
+    def with_image_assets(self):
+        """
+        Attach the `ImageAsset` of every image field to the fetched objects as
+        `obj.image_assets` ({field: asset}), using one extra query in total.
+        """
+        clone = self._chain()
+        clone._with_image_assets = True
+        return clone
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._with_image_assets = self._with_image_assets
+        return clone
+
+    def _fetch_all(self):
+        fetched = self._result_cache is not None
+        super()._fetch_all()
+        if self._with_image_assets and not fetched:
+            attach_image_assets(
+                [obj for obj in self._result_cache if isinstance(obj, ProcessedImagesModel)]
+            )
+
+
+def attach_image_assets(objects):
+    """
+    Set `image_assets` on each object from a single `ImageAsset` query.
+    Deferred image fields are skipped rather than loaded one object at a time.
+    """
+    loaded = [
+        (obj, [
+            getattr(obj, field) for field in obj.image_fields
+            if field not in obj.get_deferred_fields()
+        ])
+        for obj in objects
+    ]
+    names = {image_file.name for _, files in loaded for image_file in files if image_file}
+    assets = ImageAsset.objects.in_bulk(names, field_name="name") if names else {}
+    for obj, files in loaded:
+        obj.image_assets = {
+            image_file.field.name: assets[image_file.name]
+            for image_file in files
+            if image_file and image_file.name in assets
+        }
+    return objects
+
+
+class PropertyQuerySet(ProcessedImagesQuerySet):
+    """QuerySet for properties."""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """
+        Allocate property IDs for the whole batch at once and fill in the
+        derived plot area, then index the new rows for search, maps and the
+        typeahead (bulk_create sends no post_save signals). Images are not
+        processed; run `reprocess_images` after a bulk import.
+        """
+        objs = list(objs)
+        missing = [obj for obj in objs if not obj.property_id]
+        for obj, value in zip(missing, property_ids.next_values(len(missing))):
+            obj.property_id = format_property_id(value)
+        for obj in objs:
+            obj.plot_area_sqft = plot_area_to_sqft(obj.plot_area, obj.plot_unit)
+        created = super().bulk_create(objs, *args, **kwargs)
+        pks = [obj.pk for obj in created if obj.pk is not None]
+        search.index_properties(pks)
+        geo.index_properties(pks)
+        bump_inventory_version()
+        added = [("property", obj.property_id) for obj in created]
+        transaction.on_commit(lambda: typeahead_index.update(added=added))
+        return created
+
+    def for_cards(self):
+        """
+        Load just what a property card renders: the `CARD_FIELDS` projection,
+        the location joined in, and the image metadata attached. A page of
+        cards costs the same two queries however many cards it has.
+        """
+        return (
+            self.select_related("property_location")
+            .only(*CARD_FIELDS)
+            .with_image_assets()
+        )
+
+
+def touched(model, **values):
+    """
+    `values` for an update() call, plus a fresh `updated_at` when `model` has
+    one; update() skips auto_now, and cached cards are keyed on it.
+    """
+    if any(field.name == "updated_at" for field in model._meta.concrete_fields):
+        values["updated_at"] = timezone.now()
+    return values
+
+
+class ProcessedImagesModel(models.Model):
+    """
+    Abstract base for models whose image fields go through the image pipeline.
+
+    Subclasses list their fields in `image_fields`. On save, every field whose
+    file changed is processed (watermarked when `watermark_images` is set, plus
+    responsive derivatives), either inline or through the `ImageJob` queue.
+    """
+    image_fields = ()
+    watermark_images = False
+
+    objects = ProcessedImagesQuerySet.as_manager()
+
+    processed_images = models.JSONField(
+        default=dict, blank=True, editable=False,
+        help_text="Per image field: the source file name and SHA-256, and the files derived from it."
+    )
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+
+        changed_fields = self.changed_image_fields()
+        if changed_fields and getattr(settings, "IMAGE_PROCESSING_ASYNC", False):
+            from .jobs import enqueue_image_jobs
+
+            self._save_processed_images()
+            enqueue_image_jobs(self, changed_fields)
+        else:
+            self.process_images(changed_fields)
+
+    def process_images(self, fields=None):
+        """
+        Process the given image fields (default: every changed one) and
+        persist their markers.
+        """
+        if fields is None:
+            fields = self.changed_image_fields()
+        for field in fields:
+            self._process_image(field)
+        self._save_processed_images(force=bool(fields))
+
+    def _save_processed_images(self, force=False):
+        # Drop markers of cleared fields and persist the new ones without
+        # re-running save() (and with it the whole image loop).
+        processed = {
+            field: entry for field, entry in self.processed_images.items()
+            if getattr(self, field, None)
+        }
+        if force or processed != self.processed_images:
+            self.processed_images = processed
+            values = touched(type(self), processed_images=processed)
+            for name, value in values.items():
+                setattr(self, name, value)
+            type(self)._default_manager.filter(pk=self.pk).update(**values)
+            self.processed_images_saved()
+
+    def processed_images_saved(self):
+        """
+        Called after `processed_images` is written with update(), which sends
+        no signals: retire the cached pages that show the old image URLs, now
+        and again after the commit. The listing engine has no image columns
+        to change.
+        """
+        from .listing_engine import listing_engine
+
+        listing_engine.version_changed(bump_inventory_version())
+        transaction.on_commit(listing_engine.retire_after_commit)
+
+    def image_ready(self, field):
+        """Return True once the current file of `field` has been processed."""
+        image_file = getattr(self, field)
+        return bool(image_file) and (
+            self.processed_images.get(field, {}).get("name") == image_file.name
+        )
+
+    def changed_image_fields(self):
+        """
+        Return the image fields whose current file has not been processed yet.
+
+        A field counts as unchanged when its file name matches the name recorded
+        in `processed_images` the last time it was processed.
+        """
+        return [
+            field for field in self.image_fields
+            if getattr(self, field)
+            and self.processed_images.get(field, {}).get("name") != getattr(self, field).name
+        ]
+
+    def _process_image(self, field):
+        image_file = getattr(self, field)
+        if not image_file.storage.exists(image_file.name):
+            return
+
+        # A file that hashes to one of our markers has been through the pipeline
+        # already (e.g. the same upload assigned to another gallery slot), so
+        # reuse its entry instead of stacking a second watermark on top.
+        digest = file_sha256(image_file.storage, image_file.name)
+        for entry in list(self.processed_images.values()):
+            if entry.get("sha256") == digest:
+                self.processed_images[field] = dict(entry, name=image_file.name)
+                return
+
+        # The same blob may have been processed for another object.
+        asset = ImageAsset.objects.filter(name=image_file.name, sha256=digest).first()
+        if asset is not None:
+            self.processed_images[field] = dict(asset.entry, name=image_file.name)
+            return
+
+        entry = process_image_file(
+            image_file.storage, image_file.name, watermark=self.watermark_images
+        )
+        entry.update(name=image_file.name, sha256=digest)
+        self.processed_images[field] = ImageAsset.record(image_file.name, digest, entry)
+
+
+class ImageAsset(models.Model):
+    """
+    Pipeline output and metadata for one stored image file, shared by every
+    object using it.
+
+    With content-addressed storage a re-upload resolves to an existing file;
+    its asset row lets the pipeline reuse the watermarked copy and derivatives.
+    The metadata columns let templates size images and paint placeholders
+    without opening the file (see `ProcessedImagesQuerySet.with_image_assets`).
+    """
+    # Keys of the pipeline output kept only here, not in `processed_images`.
+    METADATA_KEYS = ("format", "bytes", "lqip", "dominant_color")
+
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    entry = models.JSONField(default=dict)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    bytes = models.PositiveBigIntegerField(null=True, blank=True)
+    format = models.CharField(max_length=10, blank=True, default="")
+    lqip = models.TextField(
+        blank=True, default="", help_text="Tiny blurred preview as a data: URI."
+    )
+    dominant_color = models.CharField(max_length=7, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "image_asset"
+
+    def __str__(self) -> str:
+        return self.name
+
+    @classmethod
+    def record(cls, name, sha256, entry):
+        """
+        Store the pipeline output for `name` and return the entry to keep in
+        `processed_images`, i.e. without the asset-only metadata.
+        """
+        entry = dict(entry)
+        metadata = {key: entry.pop(key) for key in cls.METADATA_KEYS if key in entry}
+        cls.objects.update_or_create(
+            name=name,
+            defaults=dict(
+                sha256=sha256, entry=entry,
+                width=entry.get("width"), height=entry.get("height"), **metadata
+            ),
+        )
+        return entry
+
+
+class Location(ProcessedImagesModel):
     """
     Model to manage locations manually.
     """
     location_name = models.CharField(max_length=100, unique=True)
-    location_image = models.ImageField(upload_to="locations/images/", blank=True, null=True)
+    location_image = models.ImageField(
+        upload_to="locations/images/", blank=True, null=True, storage=get_image_storage,
+        validators=[validate_image_dimensions],
+    )
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+
+    image_fields = ("location_image",)
 
     class Meta:
         db_table = "location"
@@ -50,10 +385,20 @@ class Location(models.Model):
     def __str__(self) -> str:
         return self.location_name
 
-class Property(models.Model):
+    def processed_images_saved(self):
+        super().processed_images_saved()
+        bump_locations_version()  # And again after the commit, as in signals.py.
+        transaction.on_commit(bump_locations_version)
+
+class Property(ProcessedImagesModel):
     """
     Property model representing a real estate property.
     """
+    image_fields = IMAGE_FIELDS
+    watermark_images = True
+
+    objects = PropertyQuerySet.as_manager()
+
     id = models.AutoField(primary_key=True)
     property_id = models.CharField(
         max_length=10, unique=True, editable=False, blank=True, null=True
@@ -71,16 +416,20 @@ class Property(models.Model):
     property_description = models.TextField()
     short_description = models.TextField(null=True, blank=True)
     property_main_image = models.ImageField(
-        upload_to="properties/images", blank=True, null=True
+        upload_to="properties/images", blank=True, null=True, storage=get_image_storage,
+        validators=[validate_image_dimensions],
     )
     gallery_1 = models.ImageField(
-        upload_to="properties/images/gallery/", blank=True, null=True
+        upload_to="properties/images/gallery/", blank=True, null=True, storage=get_image_storage,
+        validators=[validate_image_dimensions],
     )
     gallery_2 = models.ImageField(
-        upload_to="properties/images/gallery/", blank=True, null=True
+        upload_to="properties/images/gallery/", blank=True, null=True, storage=get_image_storage,
+        validators=[validate_image_dimensions],
     )
     gallery_3 = models.ImageField(
-        upload_to="properties/images/gallery/", blank=True, null=True
+        upload_to="properties/images/gallery/", blank=True, null=True, storage=get_image_storage,
+        validators=[validate_image_dimensions],
     )
     price = models.DecimalField(
         max_digits=10, decimal_places=2, null=True, blank=True
@@ -98,9 +447,36 @@ class Property(models.Model):
         max_length=10, choices=PLOT_UNIT_CHOICES, blank=True, null=True,
         help_text="Select unit of plot area."
     )
-    
+    latitude = models.FloatField(
+        null=True, blank=True, help_text="Leave empty to use the location's coordinates."
+    )
+    longitude = models.FloatField(null=True, blank=True)
+    plot_area_sqft = models.DecimalField(
+        max_digits=14, decimal_places=2, null=True, blank=True, editable=False,
+        help_text="Plot area converted to square feet, for range filters.",
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
     class Meta:
         db_table = "property"
+        # Match the filter shapes of filter_properties: equality on type /
+        # subtype / bhk, then a price range read in (price, id) order.
+        indexes = [
+            models.Index(fields=["price", "id"], name="property_price_id_idx"),
+            models.Index(fields=["property_type", "price"], name="property_type_price_idx"),
+            models.Index(
+                fields=["property_type", "property_subtype", "price"],
+                name="property_subtype_price_idx",
+            ),
+            models.Index(
+                fields=["property_type", "property_subtype", "bhk", "price"],
+                name="property_bhk_price_idx",
+            ),
+            models.Index(
+                fields=["property_type", "property_subtype", "plot_area_sqft"],
+                name="property_plot_area_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.property_name
@@ -134,40 +510,64 @@ class Property(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.property_id:
-            last_property = Property.objects.all().aggregate(Max("id"))
-            last_property_id = last_property["id__max"]
-            self.property_id = f"DL{1000 + (last_property_id or 0)}"
-        
+            self.property_id = format_property_id(property_ids.next_value())
+        self.plot_area_sqft = plot_area_to_sqft(self.plot_area, self.plot_unit)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            derived = {"updated_at"}
+            if {"plot_area", "plot_unit"} & set(update_fields):
+                derived.add("plot_area_sqft")
+            kwargs["update_fields"] = {*update_fields, *derived}
+
         super().save(*args, **kwargs)
 
-        for field in ['property_main_image', 'gallery_1', 'gallery_2', 'gallery_3']:
-            image_file = getattr(self, field)
-            if image_file:
-                self._add_watermark(image_file)
 
-    def _add_watermark(self, image_field):
-        image_path = image_field.path
-        if not os.path.exists(image_path):
-            return
+def format_property_id(value):
+    return f"DL{value}"
+
+
+class IdSequence(models.Model):
+    """
+    Counter behind a `SequenceAllocator`: `next_value` is the first value no
+    process has reserved yet.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    next_value = models.BigIntegerField()
+
+    class Meta:
+        db_table = "id_sequence"
+
+    def __str__(self) -> str:
+        return f"{self.name} ({self.next_value})"
+
+
+class ImageJob(models.Model):
+    """
+    Queued image processing for one image field of a model instance.
+
+    Jobs are created by `Property.save()` when `IMAGE_PROCESSING_ASYNC` is on and
+    consumed by the `process_image_jobs` management command.
+    """
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    target = GenericForeignKey("content_type", "object_id")
+    field_name = models.CharField(max_length=50)
+    source_name = models.CharField(
+        max_length=255, help_text="File name the job was queued for."
+    )
+    status = models.CharField(
+        max_length=20, choices=JOB_STATUS_CHOICES, default="pending"
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "image_job"
+        ordering = ("id",)
+        indexes = [models.Index(fields=["status", "id"])]
+
+    def __str__(self) -> str:
+        return f"{self.content_type.model} #{self.object_id} {self.field_name} ({self.status})"
 
-        with Image.open(image_path) as photo:
-            watermark_path = os.path.join(settings.BASE_DIR, "static/images/dreamslandrealtys.png")
-            watermark = Image.open(watermark_path).convert("RGBA")
-            watermark_width = int(photo.width * 1)
-            aspect_ratio = watermark.width / watermark.height
-            watermark_height = int(watermark_width / aspect_ratio)
-            watermark = watermark.resize((watermark_width, watermark_height), Image.Resampling.LANCZOS)
-            watermark = watermark.copy()
-            alpha = watermark.split()[3]
-            alpha = ImageEnhance.Brightness(alpha).enhance(1)
-            watermark.putalpha(alpha)
-            photo = photo.convert("RGBA")
-            position = (
-                (photo.width - watermark_width) // 2,
-                (photo.height - watermark_height) // 2,
-            )
-            transparent = Image.new("RGBA", photo.size, (0, 0, 0, 0))
-            transparent.paste(photo, (0, 0))
-            transparent.paste(watermark, position, mask=watermark)
-            final_image = transparent.convert("RGB")
-            final_image.save(image_path)
@@ -0,0 +1,53 @@
+"""
+page_cache.py - Whole-response cache for the listing and static pages.
+
+Responses are cached under the current inventory version, which the signal
+handlers bump on every Property / Location change. A cached page is therefore
+never stale: after an edit the next request misses, renders the new page
+and caches it under the new version, and the old entries simply expire.
+"""
+
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.http import urlencode
+
+from .inventory import inventory_version
+
+PAGE_CACHE_ALIAS = getattr(settings, "PAGE_CACHE_ALIAS", "default")
+PAGE_CACHE_TIMEOUT = getattr(settings, "PAGE_CACHE_TIMEOUT", 60 * 60)
+
+
+def page_cache_key(request):
+    """The cache key of `request`'s page: path and sorted query under the current version."""
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    digest = hashlib.sha1(f"{request.path}?{query}".encode()).hexdigest()
+    return f"page:{inventory_version()}:{digest}"
+
+
+def _cacheable(response):
+    # Never share a response that sets a cookie (a session or CSRF token).
+    return response.status_code == 200 and not response.streaming and not response.cookies
+
+
+def versioned_cache_page(view):
+    """Serve GET/HEAD responses of `view` from the page cache until the inventory changes."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return view(request, *args, **kwargs)
+        cache = caches[PAGE_CACHE_ALIAS]
+        # Read the version before rendering, so a change made meanwhile
+        # leaves this page under the old version instead of the new one.
+        key = page_cache_key(request)
+        response = cache.get(key)
+        if response is None:
+            response = view(request, *args, **kwargs)
+            if _cacheable(response):
+                cache.set(key, response, PAGE_CACHE_TIMEOUT)
+        return response
+
+    return wrapper
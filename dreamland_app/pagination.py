@@ -0,0 +1,142 @@
+"""
+pagination.py - Keyset (cursor) pagination for the listing pages.
+
+Pages are addressed by the sort key of their first or last row instead of an
+OFFSET, so every page is one indexed range scan no matter how deep it is.
+"""
+
+import base64
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+PAGE_SIZE = getattr(settings, "LISTING_PAGE_SIZE", 24)
+
+
+class KeysetPage:
+    """One page of results plus the cursors of its neighbours."""
+
+    def __init__(self, items, next_cursor=None, previous_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+def encode_cursor(values, direction):
+    payload = json.dumps([direction, [str(v) if isinstance(v, Decimal) else v for v in values]])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, length):
+    """Return `(direction, values)`, or None for a missing or malformed cursor."""
+    if not cursor:
+        return None
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        direction, values = json.loads(payload)
+    except (ValueError, TypeError):
+        return None
+    if direction not in ("next", "prev") or not isinstance(values, list) or len(values) != length:
+        return None
+    return direction, values
+
+
+def cursor_values(model, fields, values):
+    """
+    The decoded cursor `values` cleaned by the model `fields` they belong to,
+    or None when one isn't a valid value (a cursor edited by hand). NULL is
+    never valid: the rows being paged have none.
+    """
+    try:
+        cleaned = [
+            model._meta.get_field(field).clean(value, None)
+            for field, value in zip(fields, values)
+        ]
+    except (ValidationError, TypeError, ValueError, ArithmeticError):
+        return None
+    return None if any(value is None for value in cleaned) else cleaned
+
+
+def _after(ordering, values, reverse=False):
+    """
+    Q for rows strictly after `values` in `ordering` (before, if `reverse`):
+    `(a > x) OR (a = x AND b > y) OR ...`, honouring `-field` descending keys.
+    """
+    condition = Q(pk__in=[])
+    for i, key in enumerate(ordering):
+        field = key.lstrip("-")
+        ascending = not key.startswith("-")
+        lookup = "gt" if ascending != reverse else "lt"
+        step = Q(**{f"{field}__{lookup}": values[i]})
+        for prior, value in zip(ordering[:i], values):
+            step &= Q(**{prior.lstrip("-"): value})
+        condition |= step
+    return condition
+
+
+def _reversed(ordering):
+    return [key[1:] if key.startswith("-") else f"-{key}" for key in ordering]
+
+
+def paginate_keyset(queryset, ordering, cursor=None, per_page=PAGE_SIZE):
+    """
+    Return the KeysetPage of `queryset` sorted by `ordering` that `cursor`
+    points at (the first page when it is empty or invalid).
+
+    `ordering` must end in a unique field (e.g. `("price", "id")`) and its
+    fields, all on `queryset`'s model, must not be NULL for the rows being
+    paged.
+    """
+    ordering = list(ordering)
+    fields = [key.lstrip("-") for key in ordering]
+    decoded = decode_cursor(cursor, len(ordering))
+    if decoded is not None:
+        values = cursor_values(queryset.model, fields, decoded[1])
+        decoded = (decoded[0], values) if values is not None else None
+
+    if decoded is None:
+        rows = list(queryset.order_by(*ordering)[:per_page + 1])
+        more, backwards = len(rows) > per_page, False
+    else:
+        direction, values = decoded
+        backwards = direction == "prev"
+        if backwards:
+            rows = list(
+                queryset.filter(_after(ordering, values, reverse=True))
+                .order_by(*_reversed(ordering))[:per_page + 1]
+            )
+        else:
+            rows = list(queryset.filter(_after(ordering, values)).order_by(*ordering)[:per_page + 1])
+        more = len(rows) > per_page
+
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+    if not rows:
+        return KeysetPage(rows)
+
+    def key_of(row):
+        return [getattr(row, field) for field in fields]
+
+    has_next = more if not backwards else True
+    has_previous = (decoded is not None) if not backwards else more
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor(key_of(rows[-1]), "next") if has_next else None,
+        previous_cursor=encode_cursor(key_of(rows[0]), "prev") if has_previous else None,
+    )
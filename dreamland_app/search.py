@@ -0,0 +1,99 @@
+"""
+search.py - Full-text search over listings, backed by an SQLite FTS5 table.
+
+`property_fts` holds one row per property (rowid = property.id) with its ID,
+name, descriptions and location name. The signal handlers in signals.py keep
+it in sync; `rebuild_search_index` refills it from scratch.
+"""
+
+import re
+
+from django.db import connection
+
+FTS_TABLE = "property_fts"
+
+# bm25() column weights, in the table's column order: a hit on the property ID
+# or name outranks one buried in the description.
+BM25_WEIGHTS = (10.0, 5.0, 2.0, 1.0, 4.0)
+
+SEARCH_RESULT_LIMIT = 100
+
+# Ids per statement when (re)indexing, well under SQLite's variable limit.
+INDEX_BATCH_SIZE = 500
+
+# The ID is indexed twice ("DL1005 1005") so the bare number matches too.
+INDEX_ROWS_SQL = f"""
+    INSERT INTO {FTS_TABLE} (rowid, property_id, property_name, short_description,
+                             property_description, location_name)
+    SELECT p.id,
+           COALESCE(p.property_id, '') || ' ' || COALESCE(SUBSTR(p.property_id, 3), ''),
+           p.property_name, COALESCE(p.short_description, ''), p.property_description,
+           COALESCE(l.location_name, '')
+    FROM property p LEFT JOIN location l ON l.id = p.property_location_id
+"""
+
+TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def search_enabled():
+    return connection.vendor == "sqlite"
+
+
+def _batches(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), INDEX_BATCH_SIZE):
+        batch = ids[start:start + INDEX_BATCH_SIZE]
+        yield batch, ", ".join(["%s"] * len(batch))
+
+
+def index_properties(ids):
+    """(Re)index the properties with these primary keys."""
+    if not search_enabled():
+        return
+    with connection.cursor() as cursor:
+        for batch, placeholders in _batches(ids):
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", batch)
+            cursor.execute(f"{INDEX_ROWS_SQL} WHERE p.id IN ({placeholders})", batch)
+
+
+def remove_properties(ids):
+    if not search_enabled():
+        return
+    with connection.cursor() as cursor:
+        for batch, placeholders in _batches(ids):
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", batch)
+
+
+def rebuild_index():
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(INDEX_ROWS_SQL)
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+
+
+def match_expression(text):
+    """
+    Turn user input into an FTS5 query: every word must match, the last one
+    as a prefix so results show up while the user is still typing.
+    Returns "" when there is nothing to search for.
+    """
+    words = TOKEN.findall(text.lower())
+    if not words:
+        return ""
+    terms = [f'"{word}"' for word in words[:-1]] + [f'"{words[-1]}"*']
+    return " ".join(terms)
+
+
+def search_property_ids(text, limit=SEARCH_RESULT_LIMIT):
+    """Primary keys of the properties matching `text`, best match first."""
+    expression = match_expression(text)
+    if not expression:
+        return []
+    weights = ", ".join(str(weight) for weight in BM25_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+            f"ORDER BY bm25({FTS_TABLE}, {weights}), rowid LIMIT %s",
+            [expression, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,66 @@
+"""
+sequences.py - Block-allocated counters backed by the `IdSequence` table.
+
+Each process reserves a block of values with one atomic UPDATE and hands
+them out from memory, so allocating an ID normally costs no query at all and
+two writers can never draw the same value. Values of a block a process
+doesn't use are skipped, so sequences have gaps.
+"""
+
+import os
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+BLOCK_SIZE = getattr(settings, "ID_SEQUENCE_BLOCK_SIZE", 50)
+
+
+class SequenceAllocator:
+    """Hands out values of the sequence `name`, `block_size` reserved at a time."""
+
+    def __init__(self, name, block_size=BLOCK_SIZE):
+        self.name = name
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._pid = None
+        self._next = self._end = 0
+
+    def next_value(self):
+        return self.next_values(1)[0]
+
+    def next_values(self, count):
+        if connection.in_atomic_block:
+            # The caller's transaction could still roll the reservation back,
+            # so take exactly what is needed and keep nothing in memory.
+            return list(self._reserve(count))
+        with self._lock:
+            if self._pid != os.getpid():
+                # A forked worker must not reuse its parent's block.
+                self._pid, self._next, self._end = os.getpid(), 0, 0
+            values = []
+            while len(values) < count:
+                if self._next >= self._end:
+                    block = self._reserve(max(self.block_size, count - len(values)))
+                    self._next, self._end = block.start, block.stop
+                take = min(count - len(values), self._end - self._next)
+                values.extend(range(self._next, self._next + take))
+                self._next += take
+            return values
+
+    def _reserve(self, count):
+        """Advance the stored counter by `count`; return the reserved range."""
+        from .models import IdSequence
+
+        with transaction.atomic():
+            updated = IdSequence.objects.filter(name=self.name).update(
+                next_value=F("next_value") + count
+            )
+            if not updated:
+                raise IdSequence.DoesNotExist(f"No id sequence named {self.name!r}.")
+            end = IdSequence.objects.values_list("next_value", flat=True).get(name=self.name)
+        return range(end - count, end)
+
+
+property_ids = SequenceAllocator("property_id")
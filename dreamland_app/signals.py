@@ -0,0 +1,125 @@
+"""
+signals.py - Keeps derived data (search, spatial and typeahead indexes, the
+inventory and locations versions, the listing engine) in step with the models.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import geo, search
+from .inventory import bump_inventory_version, bump_locations_version
+from .listing_engine import listing_engine
+from .models import Location, Property
+from .typeahead import typeahead_index
+
+
+@receiver(post_save, sender=Property)
+def index_property(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_properties([instance.pk])
+        geo.index_properties([instance.pk])
+
+
+@receiver(post_delete, sender=Property)
+def unindex_property(sender, instance, **kwargs):
+    search.remove_properties([instance.pk])
+    geo.remove_properties([instance.pk])
+
+
+@receiver(pre_save, sender=Location)
+def remember_location(sender, instance, raw=False, **kwargs):
+    # The indexed name and coordinates, to tell on post_save what changed.
+    instance._previous = (
+        Location.objects.filter(pk=instance.pk)
+        .values_list("location_name", "latitude", "longitude").first()
+        if instance.pk and not raw else None
+    )
+
+
+@receiver(post_save, sender=Location)
+def reindex_location(sender, instance, raw=False, **kwargs):
+    """
+    A renamed location changes the search rows of all its properties, a moved
+    one their points. A new location has no properties yet.
+    """
+    previous = getattr(instance, "_previous", None)
+    if raw or previous is None:
+        return
+    renamed = previous[0] != instance.location_name
+    moved = previous[1:] != (instance.latitude, instance.longitude)
+    if renamed or moved:
+        ids = list(instance.locations.values_list("pk", flat=True))
+        if renamed:
+            search.index_properties(ids)
+        if moved:
+            geo.index_properties(ids)
+
+
+@receiver(pre_delete, sender=Location)
+def remember_location_properties(sender, instance, **kwargs):
+    # Deleting sets their location to NULL without saving them.
+    instance._property_ids = list(instance.locations.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Location)
+def reindex_orphaned_properties(sender, instance, **kwargs):
+    search.index_properties(getattr(instance, "_property_ids", []))
+    geo.index_properties(getattr(instance, "_property_ids", []))
+
+
+# Typeahead changes apply once committed: a rolled-back save must not leave
+# an entry behind, in this worker or the others.
+
+@receiver(post_save, sender=Property)
+def add_property_typeahead(sender, instance, created, **kwargs):
+    if created and instance.property_id:
+        added = [("property", instance.property_id)]
+        transaction.on_commit(lambda: typeahead_index.update(added=added))
+
+
+@receiver(post_delete, sender=Property)
+def remove_property_typeahead(sender, instance, **kwargs):
+    if instance.property_id:
+        removed = [("property", instance.property_id)]
+        transaction.on_commit(lambda: typeahead_index.update(removed=removed))
+
+
+@receiver(post_save, sender=Location)
+def update_location_typeahead(sender, instance, **kwargs):
+    previous = getattr(instance, "_previous", None)
+    if previous and previous[0] == instance.location_name:
+        return
+    added = [("location", instance.location_name)]
+    removed = [("location", previous[0])] if previous else []
+    transaction.on_commit(lambda: typeahead_index.update(added=added, removed=removed))
+
+
+@receiver(post_delete, sender=Location)
+def remove_location_typeahead(sender, instance, **kwargs):
+    removed = [("location", instance.location_name)]
+    transaction.on_commit(lambda: typeahead_index.update(removed=removed))
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def retire_cached_listings(sender, instance, signal, **kwargs):
+    # Now, so this transaction sees its own change, and again after the
+    # commit, so no page rendered from the old data meanwhile stays cached.
+    version = bump_inventory_version()
+    if sender is Property:
+        listing_engine.property_changed(instance, signal is post_delete, version)
+    else:
+        listing_engine.location_changed(instance, signal is post_delete, version)
+    transaction.on_commit(listing_engine.retire_after_commit)
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def retire_location_catalogue(sender, **kwargs):
+    # Now, so this transaction sees its own change, and again after the
+    # commit, so no worker keeps what it loaded from before the commit.
+    bump_locations_version()
+    transaction.on_commit(bump_locations_version)
@@ -0,0 +1,94 @@
+"""
+storage.py - Storage backends for uploaded images.
+"""
+
+import hashlib
+import posixpath
+
+from django.conf import settings
+from django.core.files.storage import Storage, storages
+
+
+class ContentAddressedStorage(Storage):
+    """
+    Storage that names every file after the SHA-256 of its content.
+
+    `properties/images/IMG_1234.jpg` is stored as `properties/images/<sha256>.jpg`.
+    Saving content that is already stored writes nothing and returns the
+    existing name, so re-uploads share one blob (and everything derived from it).
+
+    Files are kept in the backend configured as `IMAGE_STORAGE_ALIAS` in
+    `STORAGES` (the default storage unless set), so this works on top of the
+    file system as well as an object store.
+    """
+
+    @property
+    def backend(self):
+        return storages[getattr(settings, "IMAGE_STORAGE_ALIAS", "default")]
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        sha256 = hashlib.sha256()
+        if hasattr(content, "seek"):
+            content.seek(0)
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        content.seek(0)
+
+        extension = posixpath.splitext(name)[1].lower()
+        name = posixpath.join(posixpath.dirname(name), sha256.hexdigest() + extension)
+        if self.exists(name):
+            return name
+        return self.backend.save(name, content, max_length=max_length)
+
+    def open(self, name, mode="rb"):
+        return self.backend.open(name, mode)
+
+    def delete(self, name):
+        return self.backend.delete(name)
+
+    def exists(self, name):
+        return self.backend.exists(name)
+
+    def listdir(self, path):
+        return self.backend.listdir(path)
+
+    def size(self, name):
+        return self.backend.size(name)
+
+    def url(self, name):
+        return self.backend.url(name)
+
+    def path(self, name):
+        return self.backend.path(name)
+
+    def get_accessed_time(self, name):
+        return self.backend.get_accessed_time(name)
+
+    def get_created_time(self, name):
+        return self.backend.get_created_time(name)
+
+    def get_modified_time(self, name):
+        return self.backend.get_modified_time(name)
+
+
+image_storage = ContentAddressedStorage()
+
+
+def get_image_storage():
+    return image_storage
+
+
+def replace_file(storage, name, content):
+    """
+    Write `content` under exactly `name`, replacing any existing file.
+
+    Derived files (display copies, responsive variants) are named after their
+    source, so they bypass content addressing.
+    """
+    if isinstance(storage, ContentAddressedStorage):
+        storage = storage.backend
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, content)
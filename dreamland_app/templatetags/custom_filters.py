@@ -1,7 +1,19 @@
+import hashlib
+
 from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from ..conditional import template_version
+from ..imaging import DERIVATIVE_MIME_TYPES
 
 register = template.Library()
 
+CARD_CACHE_TIMEOUT = getattr(settings, "CARD_CACHE_TIMEOUT", 24 * 60 * 60)
+
 @register.filter
 def length_is(value, length):
     """
@@ -13,3 +25,127 @@ def length_is(value, length):
         return len(value) == int(length)
     except (TypeError, ValueError):
         return False
+
+
+@register.filter
+def image_ready(obj, field_name):
+    """
+    Check whether the image in `field_name` has finished background processing.
+    Usage:
+        {% if property|image_ready:"property_main_image" %}
+    """
+    return obj.image_ready(field_name)
+
+
+def derived_url(storage, name, entry):
+    # Derived files are rewritten in place by reprocessing; the revision in
+    # the query string makes the URL change with them (see media.py).
+    url = storage.url(name)
+    if not entry.get("revision"):
+        return url
+    return f"{url}{'&' if '?' in url else '?'}v={entry['revision']}"
+
+
+@register.simple_tag
+def responsive_image(obj, field_name, sizes="100vw", **attrs):
+    """
+    Render a processed image as a <picture> with a srcset per derivative format.
+    The full-size display copy is the <img> fallback; dimensions and the
+    blurred placeholder come from the recorded metadata, so nothing is read
+    from disk.
+    Usage:
+        {% responsive_image property "property_main_image" sizes="33vw" class="card-img-top" alt=property.property_name %}
+    """
+    entry = obj.processed_images.get(field_name, {})
+    storage = getattr(obj, field_name).storage
+    sources = format_html_join(
+        "",
+        '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (
+                DERIVATIVE_MIME_TYPES.get(fmt, f"image/{fmt}"),
+                ", ".join(f"{derived_url(storage, name, entry)} {width}w" for width, name in variants),
+                sizes,
+            )
+            for fmt, variants in entry.get("variants", {}).items()
+        ),
+    )
+    if entry.get("width"):
+        attrs.setdefault("width", entry["width"])
+        attrs.setdefault("height", entry["height"])
+    # Placeholder from the metadata index, when the view attached it
+    # (`.with_image_assets()`).
+    asset = getattr(obj, "image_assets", {}).get(field_name)
+    if asset is not None and asset.dominant_color:
+        attrs.setdefault(
+            "style",
+            f"background: {asset.dominant_color} url({asset.lqip}) center / cover no-repeat",
+        )
+    attrs.setdefault("loading", "lazy")
+    attrs.setdefault("decoding", "async")
+    return format_html(
+        '<picture>{}<img src="{}"{}></picture>',
+        sources,
+        processed_image_url(obj, field_name),
+        format_html_join("", ' {}="{}"', attrs.items()),
+    )
+
+
+@register.simple_tag
+def processed_image_url(obj, field_name):
+    """
+    URL of the full-size image to show for `field_name`: the display copy the
+    pipeline made (migration 0018 built the ones older entries lacked). An
+    image not processed yet falls back to the source, which only staff can
+    open.
+    Usage:
+        <a href="{% processed_image_url property "gallery_1" %}">
+    """
+    entry = obj.processed_images.get(field_name, {})
+    image_file = getattr(obj, field_name)
+    if entry.get("display"):
+        return derived_url(image_file.storage, entry["display"], entry)
+    return image_file.url
+
+
+@register.simple_tag(takes_context=True)
+def cursor_url(context, cursor):
+    """
+    Query string for another page of a keyset-paginated listing, keeping the
+    current filters.
+    Usage:
+        <a href="{% cursor_url page.next_cursor %}">Next</a>
+    """
+    params = context["request"].GET.copy()
+    params["cursor"] = cursor
+    return f"?{params.urlencode()}"
+
+
+def card_cache_key(prop):
+    # The card shows the location's name, which can change without the
+    # property's `updated_at` moving; a deploy can change the markup.
+    location = hashlib.sha1(str(prop.property_location).encode()).hexdigest()[:12]
+    return f"property-card:{template_version()}:{prop.pk}:{prop.updated_at.timestamp()}:{location}"
+
+
+@register.simple_tag
+def property_cards(properties):
+    """
+    Render the listing card of each property (property_card.html). Cards are
+    cached by id and `updated_at`, so a page of unchanged cards is one
+    get_many and a join.
+    Usage:
+        {% property_cards properties %}
+    """
+    properties = list(properties)
+    keys = [card_cache_key(prop) for prop in properties]
+    cards = cache.get_many(keys)
+    missing = {
+        key: render_to_string("property_card.html", {"property": prop})
+        for key, prop in zip(keys, properties)
+        if key not in cards
+    }
+    if missing:
+        cache.set_many(missing, CARD_CACHE_TIMEOUT)
+        cards.update(missing)
+    return mark_safe("".join(cards[key] for key in keys))
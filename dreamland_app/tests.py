@@ -3,7 +3,1179 @@ tests.py - This module contains the test cases for the real estate application.
 """
 
 # Import necessary modules for testing
-from django.test import TestCase
+import io
+import os
 
-# Create your tests here.
-# Add test cases for the Property model and views as needed.
+from django.conf import settings
+from django.core.files.storage import storages
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
+from .catalogue import location_catalogue
+from .models import Location, Property
+
+
+def make_jpeg(width, height, color=(200, 50, 50)):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+# An object store stand-in: InMemoryStorage has no local paths, like S3.
+@override_settings(
+    STORAGES={**settings.STORAGES, "images": {"BACKEND": "django.core.files.storage.InMemoryStorage"}},
+    IMAGE_STORAGE_ALIAS="images",
+    IMAGE_PROCESSING_ASYNC=False,
+)
+class ImagePipelineStorageTests(TestCase):
+    """The image pipeline only goes through the storage API."""
+
+    def test_processes_images_without_local_paths(self):
+        prop = Property(
+            property_name="Villa", property_description="Sea view", property_type="residential",
+            property_main_image=SimpleUploadedFile("villa.jpg", make_jpeg(1000, 700)),
+        )
+        prop.save()
+
+        backend = storages["images"]
+        entry = prop.processed_images["property_main_image"]
+        self.assertTrue(prop.image_ready("property_main_image"))
+        self.assertEqual((entry["width"], entry["height"]), (1000, 700))
+        self.assertTrue(backend.exists(prop.property_main_image.name))
+        self.assertTrue(backend.exists(entry["display"]))
+        for variants in entry["variants"].values():
+            for _, name in variants:
+                self.assertTrue(backend.exists(name))
+
+    def test_responsive_markup(self):
+        from django.template import Context, Template
+
+        from .imaging import derivative_formats
+
+        prop = Property(
+            property_name="Villa", property_description="-", property_type="residential",
+            property_main_image=SimpleUploadedFile("villa.jpg", make_jpeg(1000, 700)),
+        )
+        prop.save()
+        entry = prop.processed_images["property_main_image"]
+        for variants in entry["variants"].values():
+            self.assertEqual([width for width, _ in variants], [320, 640, 960])
+
+        html = Template(
+            '{% load custom_filters %}{% responsive_image prop "property_main_image" sizes="50vw" alt="Villa" %}'
+        ).render(Context({"prop": prop}))
+        self.assertEqual(html.count("<source "), len(derivative_formats()))
+        self.assertIn(f'.640w.webp?v={entry["revision"]} 640w', html)
+        self.assertIn(f'src="/media/{entry["display"]}?v={entry["revision"]}"', html)
+        self.assertIn('width="1000" height="700"', html)
+        self.assertIn('loading="lazy"', html)
+
+    def test_large_photos_are_scaled_down(self):
+        prop = Property(
+            property_name="Estate", property_description="-", property_type="residential",
+            property_main_image=SimpleUploadedFile("estate.jpg", make_jpeg(3000, 1500)),
+        )
+        prop.save()
+        entry = prop.processed_images["property_main_image"]
+        self.assertEqual((entry["width"], entry["height"]), (2560, 1280))
+        with storages["images"].open(entry["display"]) as f, Image.open(f) as display:
+            self.assertEqual(display.size, (2560, 1280))
+
+    def test_pixel_cap(self):
+        from unittest import mock
+
+        from django.core.exceptions import ValidationError
+        from django.core.files.base import ContentFile
+
+        from . import imaging, validators
+
+        upload = SimpleUploadedFile("wide.jpg", make_jpeg(400, 300))
+        storages["images"].save("wide.jpg", ContentFile(make_jpeg(400, 300)))
+        with mock.patch.object(validators, "MAX_PIXELS", 100_000), \
+                mock.patch.object(imaging, "MAX_PIXELS", 100_000):
+            with self.assertRaises(ValidationError):
+                validators.validate_image_dimensions(upload)
+            with self.assertRaises(Image.DecompressionBombError):
+                imaging.open_image(storages["images"], "wide.jpg")
+        validators.validate_image_dimensions(upload)
+
+    def test_migration_builds_missing_display_copies(self):
+        import importlib
+
+        from django.apps import apps
+
+        migration = importlib.import_module("dreamland_app.migrations.0018_build_display_copies")
+        prop = Property(
+            property_name="Villa", property_description="-", property_type="residential",
+            property_main_image=SimpleUploadedFile("villa.jpg", make_jpeg(500, 400)),
+        )
+        prop.save()
+        location = Location(location_name="Kochi", location_image=SimpleUploadedFile("k.jpg", make_jpeg(300, 200)))
+        location.save()
+        # As left by 0005 / 0009 and by the pipeline before every image had a display copy.
+        legacy = {"name": prop.property_main_image.name, "source_watermarked": True}
+        Property.objects.update(processed_images={"property_main_image": legacy})
+        Location.objects.update(processed_images={})
+
+        migration.build_display_copies(apps, None)
+
+        entry = Property.objects.get().processed_images["property_main_image"]
+        self.assertTrue(entry["source_watermarked"])
+        self.assertTrue(storages["images"].exists(entry["display"]))
+        self.assertTrue(Location.objects.get().processed_images["location_image"]["display"].endswith(".display.jpg"))
+
+    def test_display_copy_drops_the_exif(self):
+        exif = Image.Exif()
+        exif[0x010F] = "Camera"  # Make
+        buffer = io.BytesIO()
+        Image.new("RGB", (400, 300), (10, 120, 40)).save(buffer, "JPEG", exif=exif)
+        location = Location(
+            location_name="Kochi",
+            location_image=SimpleUploadedFile("kochi.jpg", buffer.getvalue()),
+        )
+        location.save()
+
+        entry = location.processed_images["location_image"]
+        with storages["images"].open(entry["display"]) as f, Image.open(f) as display:
+            self.assertEqual(len(display.getexif()), 0)
+
+    def test_metadata_is_recorded_on_the_asset(self):
+        from .models import ImageAsset
+
+        for width in (900, 901, 902):
+            Property(
+                property_name="Plot", property_description="-", property_type="residential",
+                property_main_image=SimpleUploadedFile("a.jpg", make_jpeg(width, 600)),
+            ).save()
+
+        asset = ImageAsset.objects.get(width=900)
+        self.assertEqual((asset.height, asset.format), (600, "JPEG"))
+        self.assertGreater(asset.bytes, 0)
+        self.assertRegex(asset.dominant_color, r"^#[0-9a-f]{6}$")
+        self.assertTrue(asset.lqip.startswith("data:image/"))
+        self.assertNotIn("lqip", Property.objects.first().processed_images["property_main_image"])
+
+        with self.assertNumQueries(2):
+            properties = list(Property.objects.with_image_assets())
+        self.assertEqual(
+            {prop.image_assets["property_main_image"].width for prop in properties}, {900, 901, 902}
+        )
+
+    def test_reupload_shares_the_stored_file(self):
+        data = make_jpeg(800, 600)
+        first = Property(
+            property_name="A", property_description="-", property_type="residential",
+            property_main_image=SimpleUploadedFile("a.jpg", data),
+        )
+        first.save()
+        second = Property(
+            property_name="B", property_description="-", property_type="residential",
+            property_main_image=SimpleUploadedFile("b.jpg", data),
+        )
+        second.save()
+
+        self.assertEqual(first.property_main_image.name, second.property_main_image.name)
+        self.assertEqual(
+            first.processed_images["property_main_image"]["display"],
+            second.processed_images["property_main_image"]["display"],
+        )
+
+
+class WatermarkTests(TestCase):
+    """The watermark overlay is decoded and scaled once, and blended like Pillow's paste."""
+
+    def setUp(self):
+        import tempfile
+
+        from .imaging import WatermarkCache
+
+        handle, self.path = tempfile.mkstemp(suffix=".png")
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+        Image.new("RGBA", (100, 50), (255, 255, 255, 128)).save(self.path)
+        self.cache = WatermarkCache(self.path, max_bytes=100 * 50 * 4 * 2)
+
+    def test_overlays_are_cached_per_width(self):
+        overlay = self.cache.get(100)
+        self.assertIs(self.cache.get(100), overlay)
+        self.assertEqual(overlay.shape, (50, 100, 4))
+        self.assertFalse(overlay.flags.writeable)
+        # Over max_bytes, the least recently used overlay goes first.
+        self.cache.get(80)
+        self.cache.get(90)
+        self.assertIsNot(self.cache.get(100), overlay)
+
+    def test_replacing_the_png_reloads_it(self):
+        self.cache.get(100)
+        Image.new("RGBA", (100, 100), (0, 0, 0, 255)).save(self.path)
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        self.assertEqual(self.cache.get(100).shape, (100, 100, 4))
+
+    def test_compositing_matches_pillow(self):
+        import numpy as np
+
+        from .imaging import composite_watermark
+
+        rng = np.random.default_rng(0)
+        for photo_size, overlay_size in (((640, 480), (300, 200)), ((200, 900), (200, 600)), ((300, 100), (400, 150))):
+            with self.subTest(photo=photo_size, overlay=overlay_size):
+                photo = Image.fromarray(rng.integers(0, 256, (*photo_size[::-1], 3), dtype=np.uint8))
+                overlay = rng.integers(0, 256, (*overlay_size[::-1], 4), dtype=np.uint8)
+                overlay[: overlay.shape[0] // 3, :, 3] = 0  # A fully transparent band.
+                expected = photo.copy()
+                mark = Image.fromarray(overlay, "RGBA")
+                expected.paste(
+                    mark, ((photo.width - mark.width) // 2, (photo.height - mark.height) // 2), mark
+                )
+                self.assertEqual(composite_watermark(photo, overlay).tobytes(), expected.tobytes())
+
+
+@override_settings(
+    STORAGES={**settings.STORAGES, "images": {"BACKEND": "django.core.files.storage.InMemoryStorage"}},
+    IMAGE_STORAGE_ALIAS="images",
+    IMAGE_PROCESSING_ASYNC=False,
+)
+class ChangeAwareProcessingTests(TestCase):
+    """Images are processed once per file, not on every save."""
+
+    def test_saving_other_fields_does_not_reprocess(self):
+        from unittest import mock
+
+        from . import models
+
+        prop = Property(
+            property_name="Villa", property_description="Sea view", property_type="residential",
+            property_main_image=SimpleUploadedFile("villa.jpg", make_jpeg(900, 600)),
+        )
+        prop.save()
+        entry = prop.processed_images["property_main_image"]
+
+        prop = Property.objects.get(pk=prop.pk)
+        with mock.patch.object(models, "process_image_file") as process_image_file:
+            prop.price = 5_000_000
+            prop.save()
+        process_image_file.assert_not_called()
+        self.assertEqual(Property.objects.get(pk=prop.pk).processed_images["property_main_image"], entry)
+
+    def test_reused_file_is_not_watermarked_twice(self):
+        prop = Property(
+            property_name="Villa", property_description="Sea view", property_type="residential",
+            property_main_image=SimpleUploadedFile("villa.jpg", make_jpeg(900, 600)),
+        )
+        prop.save()
+        prop.gallery_1 = prop.property_main_image.name
+        prop.save()
+        self.assertEqual(
+            prop.processed_images["gallery_1"]["display"],
+            prop.processed_images["property_main_image"]["display"],
+        )
+
+
+@override_settings(
+    STORAGES={**settings.STORAGES, "images": {"BACKEND": "django.core.files.storage.InMemoryStorage"}},
+    IMAGE_STORAGE_ALIAS="images",
+    IMAGE_PROCESSING_ASYNC=True,
+)
+class ImageJobQueueTests(TestCase):
+    """Uploads are queued and processed by the process_image_jobs worker."""
+
+    def test_worker_processes_queued_images(self):
+        from django.core.management import call_command
+
+        from .models import ImageJob
+
+        prop = Property(
+            property_name="Villa", property_description="Sea view", property_type="residential",
+            property_main_image=SimpleUploadedFile("villa.jpg", make_jpeg(900, 600)),
+        )
+        prop.save()
+        prop.save()  # Already queued; no second job.
+        self.assertFalse(prop.image_ready("property_main_image"))
+        self.assertEqual(ImageJob.objects.get().status, "pending")
+
+        call_command("process_image_jobs", "--once", "--workers", "1", stdout=io.StringIO())
+
+        self.assertEqual(ImageJob.objects.get().status, "done")
+        prop = Property.objects.get(pk=prop.pk)
+        self.assertTrue(prop.image_ready("property_main_image"))
+        self.assertContains(self.client.get(f"/propertydetails/{prop.pk}"), ".wm.jpg")
+
+
+class ReprocessImagesCommandTests(TestCase):
+    """reprocess_images rebuilds every image in worker processes and resumes from its checkpoint."""
+
+    def setUp(self):
+        import shutil
+        import tempfile
+
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        override = override_settings(MEDIA_ROOT=self.root, IMAGE_PROCESSING_ASYNC=False)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.props = [
+            Property.objects.create(
+                property_name=name, property_description="-", property_type="residential",
+                property_main_image=SimpleUploadedFile(f"{name}.jpg", make_jpeg(500, 400, color)),
+            )
+            for name, color in (("a", (200, 0, 0)), ("b", (0, 0, 200)))
+        ]
+
+    def test_resumes_from_the_checkpoint(self):
+        from django.core.management import call_command
+
+        checkpoint = f"{self.root}/checkpoint"
+        done, pending = self.props
+        with open(checkpoint, "w") as f:
+            f.write(f"{done.property_main_image.name}\t1\n")
+        revisions = {prop.pk: prop.processed_images["property_main_image"]["revision"] for prop in self.props}
+
+        output = io.StringIO()
+        call_command("reprocess_images", workers=1, checkpoint=checkpoint, stdout=output)
+        self.assertIn("1 already done, 1 to process", output.getvalue())
+        for prop in self.props:
+            prop.refresh_from_db()
+        self.assertEqual(done.processed_images["property_main_image"]["revision"], revisions[done.pk])
+        self.assertNotEqual(pending.processed_images["property_main_image"]["revision"], revisions[pending.pk])
+        self.assertTrue(pending.image_ready("property_main_image"))
+        # A run that finishes cleanly starts from scratch next time.
+        self.assertFalse(os.path.exists(checkpoint))
+
+    def test_reloads_the_location_catalogue(self):
+        from django.core.management import call_command
+
+        location = Location.objects.create(
+            location_name="Kochi", location_image=SimpleUploadedFile("k.jpg", make_jpeg(300, 200)),
+        )
+        before = location_catalogue.get(location.pk).processed_images["location_image"]["revision"]
+        call_command("reprocess_images", workers=1, checkpoint=f"{self.root}/checkpoint", stdout=io.StringIO())
+        self.assertNotEqual(location_catalogue.get(location.pk).processed_images["location_image"]["revision"], before)
+
+
+@override_settings(
+    STORAGES={**settings.STORAGES, "images": {"BACKEND": "django.core.files.storage.InMemoryStorage"}},
+    IMAGE_STORAGE_ALIAS="images",
+    IMAGE_PROCESSING_ASYNC=False,
+)
+class PropertyCardQueryTests(TestCase):
+    """Listing pages run a fixed number of queries, however many cards they show."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.image = make_jpeg(400, 300)
+        cls.locations = [
+            Location.objects.create(location_name=name) for name in ("Kochi", "Dubai", "Pune")
+        ]
+
+    def add_properties(self, count):
+        for i in range(count):
+            Property.objects.create(
+                property_name=f"Property {i}", property_description="Long description " * 50,
+                property_type="residential", price=1_000_000 + i, square_feet=1200,
+                property_location=self.locations[i % len(self.locations)],
+                property_main_image=SimpleUploadedFile(f"p{i}.jpg", self.image),
+            )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_listings(self):
+        urls = ["/", "/properties", "/propertieslist/?min_sqft=0", "/search?location=o", "/location/kochi/"]
+        location_catalogue.all()  # Loaded once per worker, not per request.
+        self.add_properties(3)
+        few = {url: self.count_queries(url) for url in urls}
+        self.add_properties(9)
+        many = {url: self.count_queries(url) for url in urls}
+        self.assertEqual(few, many)
+
+    def test_cards_defer_the_description(self):
+        self.add_properties(1)
+        card = Property.objects.for_cards().get()
+        self.assertIn("property_description", card.get_deferred_fields())
+        with self.assertNumQueries(0):
+            str(card.property_location)
+            card.image_assets["property_main_image"]
+
+
+class KeysetPaginationTests(TestCase):
+    """Listings page by cursor; a cursor that doesn't decode shows the first page."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Property.objects.bulk_create(
+            Property(
+                property_name=f"Property {i}", property_description="-", property_type="residential",
+                price=(i % 7) * 1000, square_feet=1000,
+            )
+            for i in range(50)
+        )
+
+    def test_walks_forward_and_back(self):
+        from .pagination import paginate_keyset
+
+        queryset = Property.objects.all()
+        pages, cursor = [], None
+        while True:
+            page = paginate_keyset(queryset, ("price", "id"), cursor, per_page=8)
+            pages.append([prop.pk for prop in page])
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual(
+            [pk for page in pages for pk in page],
+            list(queryset.order_by("price", "id").values_list("pk", flat=True)),
+        )
+
+        back = []
+        page = paginate_keyset(queryset, ("price", "id"), cursor, per_page=8)
+        while page.has_previous():
+            page = paginate_keyset(queryset, ("price", "id"), page.previous_cursor, per_page=8)
+            back.insert(0, [prop.pk for prop in page])
+        self.assertEqual(back, pages[:-1])
+
+    def test_tampered_cursors_show_the_first_page(self):
+        from .pagination import encode_cursor, paginate_keyset
+
+        first = [prop.pk for prop in paginate_keyset(Property.objects.all(), ("price", "id"), per_page=8)]
+        cursors = ["garbage"] + [
+            encode_cursor(values, "next")
+            for values in (["abc", 1], [None, 1], [[1], 1], ["NaN", 1], ["1e999999", 1], [0, "9" * 30])
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                page = paginate_keyset(Property.objects.all(), ("price", "id"), cursor, per_page=8)
+                self.assertEqual([prop.pk for prop in page], first)
+                for url in ("/", "/properties", "/propertieslist/?min_sqft=0"):
+                    self.assertEqual(self.client.get(url, {"cursor": cursor}).status_code, 200)
+                with self.settings(LISTING_ENGINE=True):
+                    response = self.client.get("/propertieslist/", {"min_sqft": 0, "cursor": cursor})
+                self.assertEqual(response.status_code, 200)
+
+
+class FilterIndexTests(TestCase):
+    """The common filter_properties shapes are answered from an index, not a table scan."""
+
+    FILTERS = [
+        {},
+        {"property_type": "residential"},
+        {"property_type": "residential", "property_subtype": "residential_apartments"},
+        {"property_type": "residential", "property_subtype": "residential_apartments", "bhk": 3},
+        {"property_type": "commercial", "property_subtype": "commercial_shop"},
+    ]
+
+    def test_filters_use_an_index(self):
+        for filters in self.FILTERS:
+            queryset = Property.objects.for_cards().filter(
+                price__gte=0, price__lte=10_000_000,
+                square_feet__gte=500, square_feet__lte=5000,
+                **filters,
+            ).order_by("price", "id")
+            plan = queryset.explain()
+            with self.subTest(filters=filters):
+                self.assertRegex(plan, r'SEARCH "?property"? USING INDEX')
+                self.assertNotRegex(plan, r'SCAN "?property"?(?! USING)')
+                self.assertNotIn("TEMP B-TREE", plan)
+
+
+class SearchIndexTests(TestCase):
+    """Search ranks listings from the FTS index, which follows every edit."""
+
+    def setUp(self):
+        self.kochi = Location.objects.create(location_name="Kochi", latitude=9.93, longitude=76.26)
+        self.villa = Property.objects.create(
+            property_name="Sea View Villa", property_description="Near the beach",
+            property_type="residential", property_location=self.kochi,
+        )
+        self.flat = Property.objects.create(
+            property_name="Green Apartments", property_description="Villa style",
+            property_type="residential",
+        )
+
+    def search(self, **params):
+        return [prop.pk for prop in self.client.get("/search", params).context["properties"]]
+
+    def test_ranking_and_matches(self):
+        self.assertEqual(self.search(location="vill"), [self.villa.pk, self.flat.pk])
+        self.assertEqual(self.search(location="koch"), [self.villa.pk])
+        self.assertEqual(self.search(property_id=self.villa.property_id[2:]), [self.villa.pk])
+        self.assertEqual(self.client.get("/search", {"location": '"*('}).status_code, 200)
+
+    def test_follows_location_changes(self):
+        self.kochi.location_name = "Ernakulam"
+        self.kochi.save()
+        self.assertEqual(self.search(location="ernak"), [self.villa.pk])
+        self.kochi.delete()
+        self.assertEqual(self.search(location="ernak"), [])
+        self.flat.delete()
+        self.assertEqual(self.search(location="villa"), [self.villa.pk])
+
+    def test_reindexes_only_what_a_location_change_touches(self):
+        from unittest import mock
+
+        from . import geo, search
+
+        with mock.patch.object(search, "index_properties") as index_search, \
+                mock.patch.object(geo, "index_properties") as index_geo:
+            self.kochi.save()
+            self.assertFalse(index_search.called or index_geo.called)
+            self.kochi.latitude = 10.0
+            self.kochi.save()
+            self.assertEqual((index_search.call_count, index_geo.call_count), (0, 1))
+            self.kochi.location_name = "Cochin"
+            self.kochi.save()
+            self.assertEqual((index_search.call_count, index_geo.call_count), (1, 1))
+
+    def test_reindexes_in_batches(self):
+        from unittest import mock
+
+        from . import search
+
+        Property.objects.bulk_create(
+            Property(property_name=f"Plot {i}", property_description="-",
+                     property_type="land", property_location=self.kochi)
+            for i in range(4)
+        )
+        self.kochi.location_name = "Cochin"
+        with mock.patch.object(search, "INDEX_BATCH_SIZE", 2):
+            self.kochi.save()
+        self.assertEqual(len(self.search(location="cochin")), 5)
+
+
+class TypeaheadTests(TestCase):
+    """Autocomplete follows committed changes, in this worker and the others."""
+
+    def setUp(self):
+        from .typeahead import typeahead_index
+
+        typeahead_index.clear()
+        self.addCleanup(typeahead_index.clear)
+        with self.captureOnCommitCallbacks(execute=True):
+            Location.objects.create(location_name="Abu Dhabi")
+            self.kochi = Location.objects.create(location_name="Kochi")
+            self.prop = Property.objects.create(
+                property_name="Villa", property_description="-", property_type="residential",
+            )
+
+    def suggest(self, q, **params):
+        return [
+            result["value"]
+            for result in self.client.get("/search/typeahead", {"q": q, **params}).json()["results"]
+        ]
+
+    def test_prefix_matches(self):
+        self.assertEqual(self.suggest("dha"), ["Abu Dhabi"])
+        self.assertEqual(self.suggest(self.prop.property_id[2:4], type="property"), [self.prop.property_id])
+        self.assertEqual(self.suggest(""), [])
+
+    def test_follows_committed_changes(self):
+        self.suggest("ko")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.kochi.location_name = "Kollam"
+            self.kochi.save()
+            self.prop.delete()
+            created = Property.objects.bulk_create([
+                Property(property_name="Plot", property_description="-", property_type="land"),
+            ])
+        self.assertEqual(self.suggest("ko"), ["Kollam"])
+        self.assertEqual(self.suggest(self.prop.property_id), [])
+        self.assertEqual(self.suggest(created[0].property_id), [created[0].property_id])
+
+    def test_rolled_back_changes_leave_nothing(self):
+        self.suggest("ko")
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Location.objects.create(location_name="Kottayam")
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(self.suggest("ko"), ["Kochi"])
+
+    def test_reloads_when_another_worker_changes(self):
+        from .inventory import bump_typeahead_version
+
+        self.assertEqual(self.suggest("ko"), ["Kochi"])
+        # Another worker renames the location; only the shared version tells.
+        Location.objects.filter(pk=self.kochi.pk).update(location_name="Kollam")
+        self.assertEqual(self.suggest("ko"), ["Kochi"])
+        bump_typeahead_version()
+        self.assertEqual(self.suggest("ko"), ["Kollam"])
+
+
+class FacetCountTests(TestCase):
+    """Facet counts come from one aggregate query, cached until the inventory changes."""
+
+    URL = "/propertieslist/facets?property_type=residential&bhk=5%2B"
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        for property_type, subtype, bhk, price in (
+            ("residential", "residential_apartments", 2, 3_000_000),
+            ("residential", "residential_apartments", 6, 8_000_000),
+            ("commercial", "commercial_shop", None, 1_000_000),
+        ):
+            Property.objects.create(
+                property_name="Listing", property_description="-", property_type=property_type,
+                property_subtype=subtype, bhk=bhk, price=price, square_feet=1000,
+            )
+
+    def test_each_facet_ignores_its_own_filter(self):
+        with self.assertNumQueries(1):
+            facets = self.client.get(self.URL).json()
+        self.assertEqual(facets["total"], 1)
+        self.assertEqual(facets["property_type"], {"residential": 1, "commercial": 0})
+        self.assertEqual((facets["bhk"]["2"], facets["bhk"]["5+"]), (1, 1))
+        self.assertEqual(facets["property_subtype"]["residential_apartments"], 1)
+        self.assertEqual(facets["price"], {"0-2500000": 0, "2500000-5000000": 0,
+                                           "5000000-7500000": 0, "7500000-": 1})
+
+    def test_cached_until_the_inventory_changes(self):
+        self.client.get(self.URL)
+        with self.assertNumQueries(0):
+            self.client.get(self.URL)
+        Property.objects.create(
+            property_name="Tower", property_description="-", property_type="residential",
+            bhk=7, price=9_000_000, square_feet=1000,
+        )
+        self.assertEqual(self.client.get(self.URL).json()["total"], 2)
+        self.assertEqual(len(self.client.get("/propertieslist/?bhk=5%2B&min_sqft=0").context["properties"]), 2)
+
+
+class SequenceAllocatorTests(TransactionTestCase):
+    """Allocators draw disjoint values, across threads and processes alike."""
+
+    serialized_rollback = True  # Keeps the property_id sequence row.
+
+    def setUp(self):
+        from .models import IdSequence
+
+        IdSequence.objects.create(name="test", next_value=1)
+
+    def test_threads_share_blocks_without_overlap(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        from .sequences import SequenceAllocator
+
+        allocator = SequenceAllocator("test", block_size=7)
+
+        def draw(_):
+            try:
+                return [allocator.next_value() for _ in range(25)] + allocator.next_values(10)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            values = [value for drawn in pool.map(draw, range(8)) for value in drawn]
+        self.assertEqual(len(set(values)), 8 * 35)
+
+    def test_processes_reserve_separate_blocks(self):
+        from .sequences import SequenceAllocator
+
+        first, second = SequenceAllocator("test", block_size=5), SequenceAllocator("test", block_size=5)
+        values = [allocator.next_value() for _ in range(6) for allocator in (first, second)]
+        self.assertEqual(len(set(values)), 12)
+        # Inside a transaction nothing is kept back for later.
+        with transaction.atomic():
+            self.assertEqual(first.next_values(3), [21, 22, 23])
+        self.assertEqual(second.next_values(4), [17, 18, 19, 20])
+        self.assertEqual(first.next_values(5), [12, 13, 14, 15, 24])
+
+    def test_bulk_create_allocates_unique_ids(self):
+        created = Property.objects.bulk_create(
+            Property(property_name=f"Plot {i}", property_description="-", property_type="land")
+            for i in range(30)
+        )
+        single = Property.objects.create(property_name="Villa", property_description="-", property_type="residential")
+        property_ids = {prop.property_id for prop in created} | {single.property_id}
+        self.assertEqual(len(property_ids), 31)
+        self.assertEqual(set(Property.objects.values_list("property_id", flat=True)), property_ids)
+
+
+class PlotAreaFilterTests(TestCase):
+    """Land is filtered and counted by plot area, in any unit."""
+
+    def setUp(self):
+        self.half_acre = Property.objects.create(
+            property_name="Paddy field", property_description="-", property_type="residential",
+            property_subtype="residential_land", plot_area="50", plot_unit="cent", price=100_000,
+        )
+        self.acre = Property.objects.create(
+            property_name="Estate", property_description="-", property_type="residential",
+            property_subtype="residential_land", plot_area="1", plot_unit="acre", price=200_000,
+        )
+        self.flat = Property.objects.create(
+            property_name="Flat", property_description="-", property_type="residential",
+            property_subtype="residential_apartments", square_feet=1200, price=300_000,
+        )
+
+    def listed(self, **params):
+        response = self.client.get("/propertieslist/", {"property_type": "residential", **params})
+        return [prop.pk for prop in response.context["properties"]]
+
+    def test_filters_by_plot_area_in_any_unit(self):
+        land = {"property_subtype": "residential_land"}
+        self.assertEqual(self.listed(**land, min_plot_area="60", plot_unit="cent"), [self.acre.pk])
+        self.assertEqual(self.listed(**land, max_plot_area="0.5", plot_unit="acre"), [self.half_acre.pk])
+        self.assertEqual(self.listed(**land), [self.half_acre.pk, self.acre.pk])
+
+    def test_unusable_plot_areas_are_dropped(self):
+        from .filters import parse_filters
+
+        for area in ("1e999999", "-1e999999", "1e20", "NaN", "Infinity", "abc"):
+            with self.subTest(area=area):
+                filters = parse_filters({"min_plot_area": area, "max_plot_area": area})
+                self.assertNotIn("min_plot_area_sqft", filters)
+                self.assertEqual(self.listed(property_subtype="residential_land", min_plot_area=area),
+                                 [self.half_acre.pk, self.acre.pk])
+        self.assertEqual(parse_filters({"min_plot_area": "2", "plot_unit": "acre"})["min_plot_area_sqft"], "87120.00")
+
+    def test_subtype_facets_use_their_own_size_range(self):
+        from .filters import facet_counts, parse_filters
+
+        land = facet_counts(parse_filters({"property_subtype": "residential_land", "min_plot_area": "60"}))
+        self.assertEqual(land["total"], 1)
+        self.assertEqual(land["property_subtype"]["residential_land"], 1)
+        self.assertEqual(land["property_subtype"]["residential_apartments"], 1)
+
+        flats = facet_counts(parse_filters({"property_subtype": "residential_apartments", "min_plot_area": "60"}))
+        self.assertEqual(flats["total"], 1)
+        self.assertEqual(flats["property_subtype"]["residential_land"], 1)
+
+    def test_update_fields_recompute_the_area(self):
+        self.half_acre.plot_area, self.half_acre.plot_unit = "2", "acre"
+        self.half_acre.save(update_fields=["plot_area", "plot_unit"])
+        self.half_acre.refresh_from_db()
+        self.assertEqual(self.half_acre.plot_area_sqft, 87120)
+
+    def test_areas_too_large_for_the_column_are_not_stored(self):
+        fields = dict(property_description="-", property_type="residential",
+                      property_subtype="residential_land", plot_area="99999999999999", plot_unit="acre")
+        saved = Property.objects.create(property_name="Saved", **fields)
+        Property.objects.bulk_create([Property(property_name="Bulk", **fields)])
+        for name in ("Saved", "Bulk"):
+            with self.subTest(name=name):
+                self.assertIsNone(Property.objects.get(property_name=name).plot_area_sqft)
+        self.assertEqual(saved.plot_area, "99999999999999")
+
+
+class GeoSearchTests(TestCase):
+    """Map search reads the R*Tree index, which follows property and location moves."""
+
+    def setUp(self):
+        self.kochi = Location.objects.create(location_name="Kochi", latitude=9.9312, longitude=76.2673)
+        self.trivandrum = Location.objects.create(location_name="Trivandrum", latitude=8.5241, longitude=76.9366)
+        self.in_town, self.outside, self.south = (
+            Property.objects.create(
+                property_name=name, property_description="-", property_type="residential",
+                property_location=location, **coordinates,
+            )
+            for name, location, coordinates in (
+                ("In town", self.kochi, {}),
+                ("Outside", self.kochi, {"latitude": 10.0, "longitude": 76.3}),
+                ("South", self.trivandrum, {}),
+            )
+        )
+
+    def nearby(self, **params):
+        return [hit["id"] for hit in self.client.get("/search/nearby", params).json()["results"]]
+
+    def test_radius_and_viewport(self):
+        self.assertEqual(self.nearby(near="kochi", radius_km=20), [self.in_town.pk, self.outside.pk])
+        self.assertEqual(self.nearby(lat=9.9, lng=76.3, radius_km=200),
+                         [self.in_town.pk, self.outside.pk, self.south.pk])
+        self.assertEqual(self.nearby(bbox="76.8,8.4,77.0,8.6"), [self.south.pk])
+
+    def test_follows_moves_and_deletes(self):
+        self.trivandrum.latitude = 30
+        self.trivandrum.save()
+        self.assertEqual(self.nearby(bbox="76.8,8.4,77.0,8.6"), [])
+        self.outside.delete()
+        self.assertEqual(self.nearby(near="kochi", radius_km=20), [self.in_town.pk])
+
+    def test_bad_parameters(self):
+        self.assertEqual(self.client.get("/search/nearby", {"lat": "x"}).status_code, 400)
+        self.assertEqual(self.client.get("/search/nearby", {"bbox": "1,2"}).status_code, 400)
+        self.assertEqual(self.client.get("/search/nearby", {"near": "atlantis"}).status_code, 404)
+
+
+@override_settings(LISTING_ENGINE=True)
+class ListingEngineTests(TestCase):
+    """The in-memory engine pages through filter results exactly like the SQL path."""
+
+    FILTERS = [
+        {},
+        {"location": "ko"},
+        {"property_type": "residential", "bhk": "5+"},
+        {"property_subtype": "residential_land", "min_plot_area": "20"},
+        {"min_sqft": "0", "max_sqft": "100000"},
+    ]
+
+    def setUp(self):
+        from .listing_engine import listing_engine
+
+        self.engine = listing_engine
+        self.engine.snapshot()
+        self.locations = [
+            Location.objects.create(location_name=name) for name in ("Kochi", "Kollam", "Dubai")
+        ]
+        subtypes = ["residential_apartments", "residential_land", "commercial_shop"]
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(60):
+                subtype = subtypes[i % 3]
+                Property.objects.create(
+                    property_name=f"Property {i}", property_description="Description",
+                    property_type=subtype.split("_")[0], property_subtype=subtype,
+                    bhk=(None, 1, 3, 6)[i % 4], price=(None, 100000, 3000000, 5000000)[i * 7 % 4],
+                    square_feet=(600, None, 1200, 7000)[i % 4], plot_area=(None, "10", "50")[i % 3],
+                    plot_unit="cent", property_location=(self.locations + [None])[i % 4],
+                )
+
+    def pages(self, next_page):
+        pages, cursor = [], None
+        while True:
+            page = next_page(cursor)
+            pages.append(([card.pk for card in page], page.next_cursor, page.previous_cursor))
+            if not page.has_next():
+                return pages
+            cursor = page.next_cursor
+
+    def assert_matches_sql(self):
+        from .filters import filter_query, parse_filters
+        from .pagination import paginate_keyset
+
+        for params in self.FILTERS:
+            filters = parse_filters(params)
+            queryset = Property.objects.for_cards().filter(filter_query(filters))
+            with self.subTest(params=params):
+                self.assertEqual(
+                    self.pages(lambda cursor: self.engine.page(filters, cursor, per_page=7)),
+                    self.pages(lambda cursor: paginate_keyset(queryset, ("price", "id"), cursor, per_page=7)),
+                )
+
+    def test_pages_match_sql(self):
+        self.assert_matches_sql()
+
+    def test_changes_apply_incrementally(self):
+        version = self.engine.snapshot().version
+        with self.captureOnCommitCallbacks(execute=True):
+            Property.objects.filter(price=None).first().delete()
+            changed = Property.objects.first()
+            changed.price = 12345
+            changed.save()
+            self.locations[1].location_name = "Quilon"
+            self.locations[1].save()
+        # Three changes, each bumped again once committed.
+        self.assertEqual(self.engine._snapshot.version, version + 6)
+        self.assertEqual(len(self.engine._snapshot.ids), 59)
+        self.assert_matches_sql()
+
+    def test_rebuild_before_the_commit_is_not_kept(self):
+        from .inventory import inventory_version
+        from .listing_engine import ListingColumns
+
+        self.engine.snapshot()
+        changed = Property.objects.exclude(price=None).first()
+        with self.captureOnCommitCallbacks() as callbacks:
+            changed.price = 12345
+            changed.save()
+        # Another thread rebuilt from the rows as they were before the commit.
+        stale = self.engine._snapshot
+        self.engine._snapshot = ListingColumns(inventory_version(), stale.ids, stale.columns, stale.location_names)
+        with self.captureOnCommitCallbacks(execute=True):
+            for callback in callbacks:
+                callback()
+        self.assertIsNone(self.engine._snapshot)
+        self.assert_matches_sql()
+
+    def test_deleted_location_forces_a_rebuild(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.locations[0].delete()
+        self.assertIsNone(self.engine._snapshot)
+        self.assert_matches_sql()
+
+
+class PageCacheTests(TestCase):
+    """Cached pages are served until a property or location changes."""
+
+    def setUp(self):
+        self.location = Location.objects.create(location_name="Kochi")
+
+    def add_property(self, name):
+        return Property.objects.create(
+            property_name=name, property_description="Description",
+            property_type="residential", price=1_000_000, square_feet=1200,
+            property_location=self.location,
+        )
+
+    def test_page_is_cached_until_the_inventory_changes(self):
+        for url in ("/", "/properties", "/location/kochi/"):
+            with self.subTest(url=url):
+                self.add_property(f"First {url}")
+                self.client.get(url)
+                with self.assertNumQueries(0):
+                    self.assertEqual(self.client.get(url).status_code, 200)
+                self.add_property(f"Second {url}")
+                self.assertContains(self.client.get(url), f"Second {url}")
+
+    def test_query_string_is_part_of_the_key(self):
+        self.client.get("/properties")
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/properties?cursor=x")
+        self.assertTrue(queries)
+
+    def test_static_pages_are_cached(self):
+        self.assertEqual(self.client.get("/about").status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get("/about").status_code, 200)
+
+    def test_processed_images_retire_cached_pages(self):
+        prop = self.add_property("Photo")
+        self.client.get("/properties")
+        prop._save_processed_images(force=True)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/properties")
+        self.assertTrue(queries)
+
+    def test_pages_rendered_before_the_commit_are_retired(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_property("Pending")
+            self.client.get("/properties")
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/properties")
+        self.assertTrue(queries)
+
+    def test_async_processing_requires_a_shared_cache(self):
+        from .checks import check_shared_cache
+
+        with self.settings(IMAGE_PROCESSING_ASYNC=True):
+            self.assertEqual([error.id for error in check_shared_cache(None)], ["dreamland_app.E001"])
+        shared = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache"}}
+        with self.settings(IMAGE_PROCESSING_ASYNC=True, CACHES=shared):
+            self.assertEqual(check_shared_cache(None), [])
+
+    def test_process_local_cache_warns_outside_debug(self):
+        from .checks import check_shared_cache
+
+        with self.settings(IMAGE_PROCESSING_ASYNC=False, DEBUG=False):
+            self.assertEqual([warning.id for warning in check_shared_cache(None)], ["dreamland_app.W001"])
+        with self.settings(IMAGE_PROCESSING_ASYNC=False, DEBUG=True):
+            self.assertEqual(check_shared_cache(None), [])
+        shared = {"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": "/tmp"}}
+        with self.settings(IMAGE_PROCESSING_ASYNC=False, DEBUG=False, CACHES=shared):
+            self.assertEqual(check_shared_cache(None), [])
+
+
+class PropertyCardCacheTests(TestCase):
+    """Listing cards are rendered once per (id, updated_at) and then served from the cache."""
+
+    def setUp(self):
+        from django.template import Context, Template
+
+        self.location = Location.objects.create(location_name="Kochi")
+        self.prop = Property.objects.create(
+            property_name="Sea View", property_description="Description",
+            property_type="residential", price=1_000_000, square_feet=1200,
+            property_location=self.location,
+        )
+        template = Template("{% load custom_filters %}{% property_cards properties %}")
+        self.render = lambda: template.render(Context({"properties": Property.objects.for_cards()}))
+
+    def test_unchanged_cards_come_from_the_cache(self):
+        from unittest import mock
+
+        from .templatetags import custom_filters
+
+        first = self.render()
+        with mock.patch.object(
+            custom_filters, "render_to_string", wraps=custom_filters.render_to_string
+        ) as render_to_string:
+            self.assertEqual(self.render(), first)
+        render_to_string.assert_not_called()
+
+    def test_edits_rerender_the_card(self):
+        self.render()
+        self.prop.property_name = "Hill View"
+        self.prop.save(update_fields=["property_name"])
+        self.assertIn("Hill View", self.render())
+        self.location.location_name = "Ernakulam"
+        self.location.save()
+        self.assertIn("Ernakulam", self.render())
+
+    def test_template_changes_rerender_the_card(self):
+        from unittest import mock
+
+        from .templatetags import custom_filters
+
+        self.render()
+        with mock.patch.object(custom_filters, "template_version", return_value="deployed"), \
+                mock.patch.object(custom_filters, "render_to_string", return_value="new card"):
+            self.assertEqual(self.render(), "new card")
+
+    def test_processed_images_move_updated_at(self):
+        before = Property.objects.get().updated_at
+        self.prop._save_processed_images(force=True)
+        self.assertGreater(Property.objects.get().updated_at, before)
+
+
+class ConditionalGetTests(TestCase):
+    """Unchanged property and listing pages are answered with a 304 before rendering."""
+
+    def setUp(self):
+        self.location = Location.objects.create(location_name="Kochi")
+        self.prop = Property.objects.create(
+            property_name="Sea View", property_description="Description",
+            property_type="residential", price=1_000_000, square_feet=1200,
+            property_location=self.location,
+        )
+
+    def revalidate(self, url, response, queries):
+        with self.assertNumQueries(queries):
+            return self.client.get(url, headers={"if-none-match": response["ETag"]})
+
+    def test_property_page(self):
+        url = f"/propertydetails/{self.prop.pk}"
+        response = self.client.get(url)
+        self.assertEqual(response["Last-Modified"][-3:], "GMT")
+        self.assertEqual(self.revalidate(url, response, 1).status_code, 304)
+        self.assertEqual(
+            self.client.get(url, headers={"if-modified-since": response["Last-Modified"]}).status_code,
+            304,
+        )
+
+        self.location.location_name = "Ernakulam"
+        self.location.save()
+        self.assertEqual(self.client.get(url, headers={"if-none-match": response["ETag"]}).status_code, 200)
+
+    def test_listing_pages(self):
+        for url in ("/", "/properties", "/propertieslist/?min_sqft=0", "/location/kochi/"):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(self.revalidate(url, response, 0).status_code, 304)
+                Property.objects.create(
+                    property_name="New", property_description="Description",
+                    property_type="residential", price=2_000_000, square_feet=1500,
+                )
+                self.assertEqual(self.client.get(url, headers={"if-none-match": response["ETag"]}).status_code, 200)
+
+    def test_deleting_a_listing_changes_the_etag(self):
+        response = self.client.get("/properties")
+        self.prop.delete()
+        self.assertEqual(
+            self.client.get("/properties", headers={"if-none-match": response["ETag"]}).status_code, 200
+        )
+
+
+class MediaServingTests(TestCase):
+    """Media is served with validators, byte ranges and long-lived caching."""
+
+    NAME = "f0" * 32 + ".jpg"
+
+    def setUp(self):
+        import shutil
+        import tempfile
+
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        override = override_settings(MEDIA_ROOT=self.root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.content = bytes(range(256)) * 4
+        for name in (self.NAME, "legacy.jpg"):
+            with open(f"{self.root}/{name}", "wb") as f:
+                f.write(self.content)
+
+    def test_content_addressed_files_are_immutable(self):
+        response = self.client.get(f"/media/{self.NAME}")
+        self.assertEqual(b"".join(response.streaming_content), self.content)
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertNotIn("immutable", self.client.get("/media/legacy.jpg")["Cache-Control"])
+        self.assertIn("immutable", self.client.get("/media/legacy.jpg?v=1a")["Cache-Control"])
+
+    def test_conditional_requests(self):
+        etag = self.client.get(f"/media/{self.NAME}")["ETag"]
+        self.assertEqual(self.client.get(f"/media/{self.NAME}", headers={"if-none-match": etag}).status_code, 304)
+
+    def test_ranges(self):
+        url = f"/media/{self.NAME}"
+        for header, expected in (("bytes=0-9", self.content[:10]), ("bytes=1000-", self.content[1000:]),
+                                 ("bytes=-5", self.content[-5:])):
+            with self.subTest(header=header):
+                response = self.client.get(url, headers={"range": header})
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(b"".join(response.streaming_content), expected)
+                self.assertEqual(int(response["Content-Length"]), len(expected))
+        self.assertEqual(self.client.get(url, headers={"range": "bytes=5000-"}).status_code, 416)
+        stale = self.client.get(url, headers={"range": "bytes=0-9", "if-range": '"old"'})
+        self.assertEqual(stale.status_code, 200)
+
+    def test_missing_files_and_traversal(self):
+        self.assertEqual(self.client.get("/media/missing.jpg").status_code, 404)
+        self.assertEqual(self.client.get("/media/../manage.py").status_code, 404)
+
+    def test_hand_off_to_the_proxy(self):
+        from unittest import mock
+
+        from . import media
+
+        with mock.patch.object(media, "MEDIA_SERVE_MODE", "x-accel-redirect"):
+            response = self.client.get(f"/media/{self.NAME}")
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected-media/{self.NAME}")
+        self.assertEqual(response.content, b"")
+
+    def test_uploaded_sources_are_staff_only(self):
+        from django.contrib.auth.models import User
+
+        os.makedirs(f"{self.root}/properties/images")
+        for name in (self.NAME, self.NAME.replace(".jpg", ".display.jpg"), self.NAME.replace(".jpg", ".640w.webp")):
+            with open(f"{self.root}/properties/images/{name}", "wb") as f:
+                f.write(self.content)
+        source = f"/media/properties/images/{self.NAME}"
+        for url in (source, f"/media/properties//images/{self.NAME}", f"/media/./properties/images/{self.NAME}",
+                    f"/media/locations/../properties/images/{self.NAME}"):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get(source.replace(".jpg", ".display.jpg")).status_code, 200)
+        self.assertEqual(self.client.get(source.replace(".jpg", ".640w.webp")).status_code, 200)
+
+        self.client.force_login(User.objects.create_user("staff", is_staff=True))
+        response = self.client.get(source)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Cache-Control"].startswith("private"))
+
+
+class LocationCatalogueTests(TestCase):
+    """Locations are read once per worker and reloaded when one changes."""
+
+    def setUp(self):
+        self.catalogue = location_catalogue
+        self.location = Location.objects.create(location_name="Abu Dhabi")
+
+    def test_lookups_are_served_from_memory(self):
+        self.catalogue.all()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.catalogue.by_slug("abu-dhabi"), self.location)
+            self.assertEqual(self.catalogue.by_name("abu dhabi"), self.location)
+            self.assertEqual(self.catalogue.get(self.location.pk), self.location)
+            self.assertEqual(self.catalogue.names(), ["Abu Dhabi"])
+
+    def test_changes_reload_the_catalogue(self):
+        self.catalogue.all()
+        self.location.location_name = "Sharjah"
+        self.location.save()
+        self.assertIsNone(self.catalogue.by_slug("abu-dhabi"))
+        self.assertEqual(self.catalogue.by_slug("sharjah").location_name, "Sharjah")
+        self.location.delete()
+        self.assertEqual(self.catalogue.all(), ())
+
+    def test_location_page_resolves_the_linked_slug(self):
+        self.assertEqual(self.client.get("/location/abu-dhabi/").status_code, 200)
+        self.assertEqual(self.client.get("/location/nowhere/").status_code, 404)
@@ -0,0 +1,142 @@
+"""
+typeahead.py - Per-worker prefix index for location / property ID autocomplete.
+
+Entries live in one sorted tuple of `(key, kind, label)` tuples, so a prefix
+lookup is a bisect plus a short forward scan. Each worker loads the index
+from the database on first use and tags it with the shared typeahead version
+from the cache, like the location catalogue. The signal handlers apply a
+committed change to the local copy and bump the version, so the other
+workers reload on their next lookup.
+"""
+
+import bisect
+import threading
+from collections import namedtuple
+
+from .inventory import bump_typeahead_version, typeahead_version
+
+TYPEAHEAD_LIMIT = 8
+
+
+def _keys(kind, label):
+    """
+    Lower-cased keys a label is found under: the leading label and every later
+    word ("Abu Dhabi" -> "abu dhabi", "dhabi"); property IDs also without the
+    "DL" prefix.
+    """
+    label_key = label.lower()
+    keys = {label_key}
+    if kind == "location":
+        words = label_key.split()
+        keys.update(" ".join(words[i:]) for i in range(1, len(words)))
+    elif label_key[:2].isalpha():
+        keys.add(label_key[2:])
+    return keys
+
+
+Snapshot = namedtuple("Snapshot", "version entries")
+
+
+def _insert(entries, kind, label):
+    for key in _keys(kind, label):
+        entry = (key, kind, label)
+        position = bisect.bisect_left(entries, entry)
+        if position == len(entries) or entries[position] != entry:
+            entries.insert(position, entry)
+
+
+def _delete(entries, kind, label):
+    for key in _keys(kind, label):
+        entry = (key, kind, label)
+        position = bisect.bisect_left(entries, entry)
+        if position < len(entries) and entries[position] == entry:
+            del entries[position]
+
+
+class PrefixIndex:
+    """
+    Sorted-array prefix index, safe to share between request threads.
+
+    A snapshot is never modified once published: changes build a new one, so
+    `search` reads without taking the lock.
+    """
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def _load(self, version):
+        return Snapshot(version, tuple(sorted(
+            (key, kind, label)
+            for kind, label in self._loader()
+            for key in _keys(kind, label)
+        )))
+
+    def current(self):
+        """The snapshot for the current typeahead version, reloaded if stale."""
+        version = typeahead_version()
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != version:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None or snapshot.version != version:
+                    snapshot = self._snapshot = self._load(version)
+        return snapshot
+
+    def update(self, added=(), removed=()):
+        """
+        Apply a committed change, given as `(kind, label)` pairs, and retire
+        the other workers' copies. Ours is patched when it is the version just
+        before the bump; otherwise it missed other changes and is reloaded.
+        """
+        version = bump_typeahead_version()
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != version - 1:
+                self._snapshot = None
+                return
+            entries = list(snapshot.entries)
+            for kind, label in removed:
+                _delete(entries, kind, label)
+            for kind, label in added:
+                _insert(entries, kind, label)
+            self._snapshot = Snapshot(version, tuple(entries))
+
+    def clear(self):
+        with self._lock:
+            self._snapshot = None
+
+    def search(self, prefix, kinds=None, limit=TYPEAHEAD_LIMIT):
+        """
+        Up to `limit` `(kind, label)` matches for `prefix` in key order, those
+        matching from the start of the label first.
+        """
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        entries = self.current().entries
+        position = bisect.bisect_left(entries, (prefix,))
+        leading, partial, seen = [], [], set()
+        while position < len(entries) and len(leading) + len(partial) < limit:
+            key, kind, label = entries[position]
+            if not key.startswith(prefix):
+                break
+            position += 1
+            if (kinds and kind not in kinds) or (kind, label) in seen:
+                continue
+            seen.add((kind, label))
+            (leading if label.lower().startswith(prefix) else partial).append((kind, label))
+        return leading + partial
+
+
+def _load_entries():
+    from .models import Location, Property
+
+    for name in Location.objects.values_list("location_name", flat=True):
+        yield "location", name
+    for property_id in Property.objects.exclude(property_id=None).values_list("property_id", flat=True):
+        yield "property", property_id
+
+
+typeahead_index = PrefixIndex(_load_entries)
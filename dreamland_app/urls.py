@@ -21,7 +21,10 @@ urlpatterns = [
         name="propertydetails",
     ),
     path("search", views.search_properties, name="search_properties"),
+    path("search/typeahead", views.typeahead, name="typeahead"),
+    path("search/nearby", views.nearby_properties, name="nearby_properties"),
     path("propertieslist/", views.filter_properties, name="filter_properties"),
+    path("propertieslist/facets", views.filter_facets, name="filter_facets"),
     path("locations/add/", views.add_location, name="add_location"),
     # path('contact/', views.contact_view, name='contact'),
 ]
@@ -0,0 +1,35 @@
+"""
+validators.py - Field validators for uploaded images.
+"""
+
+from django.core.exceptions import ValidationError
+from PIL import Image
+
+from .imaging import MAX_PIXELS
+
+
+def validate_image_dimensions(image_file):
+    """
+    Reject images whose header claims more than `IMAGE_MAX_PIXELS` pixels.
+    Only the header is read, so a decompression bomb is never decoded.
+    """
+    if getattr(image_file, "_committed", False):
+        return  # Already stored; it was checked when it was uploaded.
+    position = image_file.tell() if hasattr(image_file, "tell") else None
+    try:
+        with Image.open(image_file) as image:
+            width, height = image.size
+    except Image.DecompressionBombError:
+        width = height = None
+    except (OSError, SyntaxError):
+        return  # Not an image; ImageField's own validation reports that.
+    finally:
+        if position is not None:
+            image_file.seek(position)
+
+    if width is None or width * height > MAX_PIXELS:
+        raise ValidationError(
+            "Image is too large; upload a photo of at most %(limit)s megapixels.",
+            code="image_too_large",
+            params={"limit": MAX_PIXELS // 1_000_000},
+        )
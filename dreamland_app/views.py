@@ -2,33 +2,45 @@
 views.py - This module contains the view functions for the real estate application.
 """
 
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
-from .models import Property
+from django.urls import reverse
+from .models import Property, attach_image_assets
 from datetime import datetime
-from django.db.models import Q
 from .models import Location
+from .pagination import paginate_keyset
+from . import geo, search
+from .filters import cached_facet_counts, filter_query, parse_filters
+from .listing_engine import engine_enabled, listing_engine
+from .catalogue import location_catalogue
+from .conditional import listing_condition, property_condition
+from .page_cache import versioned_cache_page
+from .typeahead import typeahead_index
 from django.contrib import messages
 # from django.core.mail import send_mail
 # from django.conf import settings
 # from .forms import ContactForm
 
+@listing_condition
+@versioned_cache_page
 def index(request):
-    """Render the index page with all properties and locations."""
-    properties = Property.objects.all()
-    locations = Location.objects.all()
-    return render(request, "index.html", {"properties": properties, "locations": locations})
+    """Render the index page with a page of properties and all locations."""
+    page = paginate_keyset(Property.objects.for_cards(), ("id",), request.GET.get("cursor"))
+    locations = location_catalogue.all()
+    return render(request, "index.html", {"properties": page, "page": page, "locations": locations})
 
 def contact(request):
     """Render the contact page."""
     return render(request, "contact.html")
 
 
+@versioned_cache_page
 def services(request):
     """Render the services page."""
     return render(request, "services.html")
 
 
+@versioned_cache_page
 def career(request):
     """Render the career page."""
     return render(request, "career.html")
@@ -38,28 +50,34 @@ def propertieslist(request):
     return render(request, "propertieslist.html")
 
 
+@listing_condition
+@versioned_cache_page
 def properties(request):
-    """Render the properties page with all properties."""
-    properties = Property.objects.all()
-    locations = Location.objects.all()
-    return render(request, "properties.html", {"properties": properties,"locations": locations})
+    """Render the properties page, one page of properties at a time."""
+    page = paginate_keyset(Property.objects.for_cards(), ("id",), request.GET.get("cursor"))
+    locations = location_catalogue.all()
+    return render(request, "properties.html", {"properties": page, "page": page, "locations": locations})
 
 
+@versioned_cache_page
 def about(request):
     """Render the about page."""
     return render(request, "about.html")
 
 
+@versioned_cache_page
 def legalteam(request):
     """Render the legal team page."""
     return render(request, "legalteam.html")
 
 
+@versioned_cache_page
 def globalreach(request):
     """Render the global reach page."""
     return render(request, "globalreach.html")
 
 
+@versioned_cache_page
 def agentsnetwork(request):
     """Render the agents network page."""
     return render(request, "agentsnetwork.html")
@@ -100,28 +118,31 @@ LOCATIONS = {
 
 def get_locations():
     """Fetch the list of unique property locations."""
-    return Location.objects.values_list("location_name", flat=True).distinct()
+    return location_catalogue.names()
 
 def search_properties(request):
     """Search for properties based on location or property ID."""
-    # Fetch all location names for the dropdown
-    locations = Location.objects.all()
-
     # Get the user's search query for location and ID
     location_query = request.GET.get("location", "").strip()
     property_id_query = request.GET.get("property_id", "").strip()
     searched_properties = []
 
-    # Filter properties based on the location or property ID query
-    if location_query:
-        searched_properties = Property.objects.filter(
+    # Full-text search over ID, name, descriptions and location, best match first
+    query = location_query or property_id_query
+    if query and search.search_enabled():
+        ids = search.search_property_ids(query)
+        found = Property.objects.for_cards().in_bulk(ids)
+        searched_properties = [found[pk] for pk in ids if pk in found]
+    elif location_query:
+        searched_properties = Property.objects.for_cards().filter(
             property_location__location_name__icontains=location_query
         )
     elif property_id_query:
-        searched_properties = Property.objects.filter(property_id__icontains=property_id_query)
+        searched_properties = Property.objects.for_cards().filter(
+            property_id__icontains=property_id_query
+        )
 
     context = {
-        "locations": locations,
         "location": location_query or "No location specified",
         "property_id": property_id_query or "No ID specified",
         "properties": searched_properties,
@@ -135,10 +156,80 @@ def search_properties(request):
     return render(request, "locations.html", context)
 
 
+def typeahead(request):
+    """
+    Autocomplete suggestions as JSON: location names and property IDs starting
+    with `q`. `type=location` or `type=property` limits the kind.
+    """
+    kinds = {request.GET["type"]} if request.GET.get("type") else None
+    matches = typeahead_index.search(request.GET.get("q", ""), kinds=kinds)
+    return JsonResponse({"results": [{"type": kind, "value": label} for kind, label in matches]})
+
+
+def nearby_properties(request):
+    """
+    Properties on a map as JSON, nearest first. Takes either
+    `bbox=min_lng,min_lat,max_lng,max_lat` (the map viewport), or a centre
+    (`lat` and `lng`, or `near=<location name>`) with `radius_km` (default 10).
+    """
+    if not geo.geo_enabled():
+        return JsonResponse({"error": "Map search is not available."}, status=501)
+    try:
+        if request.GET.get("bbox"):
+            min_lng, min_lat, max_lng, max_lat = map(float, request.GET["bbox"].split(","))
+            hits = geo.properties_in_box(min_lat, min_lng, max_lat, max_lng)
+        else:
+            radius_km = float(request.GET.get("radius_km", 10))
+            if request.GET.get("near"):
+                location = location_catalogue.by_name(request.GET["near"])
+                if location is None:
+                    raise Http404("No such location.")
+                lat, lng = location.latitude, location.longitude
+                if lat is None or lng is None:
+                    return JsonResponse({"error": f"{location} has no coordinates."}, status=400)
+            else:
+                lat, lng = float(request.GET["lat"]), float(request.GET["lng"])
+            hits = geo.properties_near(lat, lng, radius_km)
+    except (KeyError, ValueError):
+        return JsonResponse(
+            {"error": "Pass bbox=min_lng,min_lat,max_lng,max_lat, or lat/lng or near with radius_km."},
+            status=400,
+        )
+
+    rows = {
+        row["id"]: row for row in Property.objects.filter(pk__in=[pk for pk, _ in hits]).values(
+            "id", "property_id", "property_name", "price", "latitude", "longitude",
+            "property_location__location_name",
+            "property_location__latitude", "property_location__longitude",
+        )
+    }
+    results = []
+    for pk, distance in hits:
+        row = rows.get(pk)
+        if row is None:
+            continue
+        results.append({
+            "id": pk,
+            "property_id": row["property_id"],
+            "name": row["property_name"],
+            "location": row["property_location__location_name"],
+            "price": str(row["price"]) if row["price"] is not None else None,
+            "latitude": row["latitude"] if row["latitude"] is not None else row["property_location__latitude"],
+            "longitude": row["longitude"] if row["longitude"] is not None else row["property_location__longitude"],
+            "distance_km": round(distance, 3),
+            "url": reverse("propertydetails", args=[pk]),
+        })
+    return JsonResponse({"results": results})
+
+
+@listing_condition
+@versioned_cache_page
 def view_location(request, location_slug):
     """Render properties for a specific location."""
-    location = get_object_or_404(Location, location_name__iexact=location_slug)
-    properties_in_location = Property.objects.filter(property_location=location)
+    location = location_catalogue.by_slug(location_slug)
+    if location is None:
+        raise Http404("No such location.")
+    properties_in_location = Property.objects.for_cards().filter(property_location_id=location.pk)
 
     context = {
         "location": location.location_name,
@@ -193,95 +284,57 @@ def add_property(request):
     return render(request, "add_property.html")
 
 
+@listing_condition
 def property_list(request):
     """Render the list of properties."""
-    properties = Property.objects.all()
-    return render(request, "property_list.html", {"properties": properties})
+    page = paginate_keyset(Property.objects.for_cards(), ("id",), request.GET.get("cursor"))
+    return render(request, "property_list.html", {"properties": page, "page": page})
 
 
+@property_condition
 def propertydetails(request, property_id):
     """
     Render details for a specific property.
     The images will display with watermark (already handled in the model's save method).
     """
     property_detail = get_object_or_404(Property, pk=property_id)
+    attach_image_assets([property_detail])
     return render(request, "propertydetails.html", {"property": property_detail})
 
 
+@listing_condition
 def filter_properties(request):
     """Filter properties based on user-selected criteria and display results."""
-    print("Received Filters:", request.GET)
-
-    # Extract and clean filters from request
-    filters = {
-        "location": request.GET.get("location", "").strip(),
-        "property_type": request.GET.get("property_type", "").strip(),
-        "property_subtype": request.GET.get("property_subtype", "").strip(),
-        "bhk": request.GET.get("bhk", "").strip(),
-        "min_price": request.GET.get("min_price", 0),
-        "max_price": request.GET.get("max_price", 10000000),
-        "min_sqft": request.GET.get("min_sqft", 500),
-        "max_sqft": request.GET.get("max_sqft", 5000),
-    }
+    filters = parse_filters(request.GET)
+
+    # Retrieve one page of filtered properties, cheapest first
+    if engine_enabled():
+        page = listing_engine.page(filters, request.GET.get("cursor"))
+    else:
+        page = paginate_keyset(
+            Property.objects.for_cards().filter(filter_query(filters)),
+            ("price", "id"),
+            request.GET.get("cursor"),
+        )
 
-    print("Filters before processing:", filters)
-    
-    # Validate and convert filters to integers if necessary
-    try:
-        # filters["bhk"] = int(filters["bhk"]) if filters["bhk"] else None
-        if filters["bhk"] and filters["bhk"].lower() != "null":  # Check if "bhk" is valid
-            filters["bhk"] = int(filters["bhk"])  
-        else:  
-            filters.pop("bhk", None)  # Remove "bhk" if it's empty, "null", or invalid
-        filters["min_price"] = int(filters["min_price"])
-        filters["max_price"] = int(filters["max_price"])
-        filters["min_sqft"] = int(filters["min_sqft"])
-        filters["max_sqft"] = int(filters["max_sqft"])
-    except ValueError:
-        # filters["bhk"] = None
-        filters.pop("bhk", None)
-        filters["min_price"] = 0
-        filters["max_price"] = 10000000
-        filters["min_sqft"] = 500
-        filters["max_sqft"] = 5000
-
-    print("Filters after processing:", filters)
-    
-    # Construct query dynamically
-    query = Q()
-    if filters["location"]:
-        query &= Q(property_location__location_name__icontains=filters["location"])
-    if filters["property_type"]:
-        query &= Q(property_type=filters["property_type"])
-    if filters["property_subtype"]:
-        query &= Q(property_subtype=filters["property_subtype"])
-    # if filters["bhk"] is not None:
-    #     query &= Q(bhk=filters["bhk"])
-    if "bhk" in filters:  # Check if "bhk" exists in the dictionary
-        query &= Q(bhk=filters["bhk"])
-    
-    # Apply numeric range filters
-    query &= Q(price__gte=filters["min_price"], price__lte=filters["max_price"])
-    query &= Q(square_feet__gte=filters["min_sqft"], square_feet__lte=filters["max_sqft"])
-    
-    # Retrieve filtered properties
-    properties = Property.objects.filter(query).order_by('price')
-    # locations = Location.objects.all()
-
-    print("Final Query:", query)
-    
     # Pass context data to template
     context = {
-        "properties": properties,
+        "properties": page,
+        "page": page,
         "selected_filters": filters,
-        # "location": Location.objects.all,  # For location autocomplete
-        # "locations": locations, 
-        # "locations": request.GET.get("location", "").strip(),
     }
-    
+
     return render(request, "propertieslist.html", context)
 
 
+def filter_facets(request):
+    """
+    Result counts per property type, subtype, BHK and price band for the
+    filter form's current state, as JSON.
+    """
+    return JsonResponse(cached_facet_counts(parse_filters(request.GET)))
+
+
 def add_location(request):
     """
     Add a new location without using forms.py.
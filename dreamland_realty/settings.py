@@ -124,6 +124,61 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# How files under MEDIA_URL are sent: "django" streams them from the worker
+# (with Range and conditional requests); "x-accel-redirect" (nginx) and
+# "x-sendfile" (Apache / lighttpd) hand the transfer to the front proxy. For
+# nginx, MEDIA_ACCEL_PREFIX is an `internal` location aliased to MEDIA_ROOT.
+MEDIA_SERVE_MODE = "django"
+MEDIA_ACCEL_PREFIX = "/protected-media/"
+
+# Watermarking runs in the `process_image_jobs` worker instead of the request
+# that uploaded the image. Set to False to process images inline. The worker
+# retires cached pages through the shared cache below (dreamland_app.E001).
+IMAGE_PROCESSING_ASYNC = True
+
+# Uploaded photos are scaled to this long edge (in pixels) before watermarking
+# and derivative generation; uploads larger than IMAGE_MAX_PIXELS are rejected.
+IMAGE_MAX_LONG_EDGE = 2560
+IMAGE_MAX_PIXELS = 60_000_000
+
+# Entry in STORAGES that holds uploaded images and their derivatives. Point it
+# at an object-store backend (e.g. django-storages' S3Storage) to keep media
+# off the local disk; the image pipeline only uses the storage API.
+IMAGE_STORAGE_ALIAS = "default"
+
+# Property cards per page on the keyset-paginated listing pages.
+LISTING_PAGE_SIZE = 24
+
+# Answer filter_properties from in-memory NumPy columns instead of SQL. Each
+# worker keeps its own copy; they stay consistent through the inventory
+# version in the cache, which must then be shared between workers.
+LISTING_ENGINE = False
+
+# The inventory version, facet counts and cached pages live in this cache,
+# as do the versions that tell each worker to reload its location catalogue
+# and typeahead index. Every process (gunicorn workers, the image worker,
+# management commands) must see the same cache, or one process's edits don't
+# retire another's copies; a local-memory cache is per process and only fits
+# a single runserver (dreamland_app.W001). The file cache works for workers
+# on one machine; for several hosts use a Redis-compatible server, e.g.
+#   "BACKEND": "django.core.cache.backends.redis.RedisCache",
+#   "LOCATION": "redis://127.0.0.1:6379/1",
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.path.join(BASE_DIR, "cache"),
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
+}
+
+# Seconds a rendered listing/static page stays in the cache. Edits retire
+# pages immediately through the inventory version; this only bounds how long
+# unused entries linger.
+PAGE_CACHE_TIMEOUT = 60 * 60
+
+# Tests run against a local-memory cache of their own.
+TEST_RUNNER = "dreamland_realty.test_runner.DreamlandTestRunner"
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
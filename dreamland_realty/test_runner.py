@@ -0,0 +1,29 @@
+"""
+test_runner.py - Test runner that keeps the tests off the shared cache.
+"""
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class DreamlandTestRunner(DiscoverRunner):
+    """
+    Runs the tests against a fresh local-memory cache, so versions and pages
+    cached by the development server (or an earlier run) never leak into
+    them, and processes images inline unless a test asks for the queue.
+    Tests run one process, so the local cache warning doesn't apply.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._test_settings = override_settings(
+            CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+            IMAGE_PROCESSING_ASYNC=False,
+            SILENCED_SYSTEM_CHECKS=[*settings.SILENCED_SYSTEM_CHECKS, "dreamland_app.W001"],
+        )
+        self._test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._test_settings.disable()
+        super().teardown_test_environment(**kwargs)
@@ -17,6 +17,10 @@ document.addEventListener("DOMContentLoaded", () => {
   const maxPriceInput = document.getElementById("max-price");
   const minSqftInput = document.getElementById("min-sqft");
   const maxSqftInput = document.getElementById("max-sqft");
+  const plotAreaDiv = document.getElementById("plot-area-range");
+  const minPlotInput = document.getElementById("min-plot-area");
+  const maxPlotInput = document.getElementById("max-plot-area");
+  const plotUnitSelect = document.getElementById("plot-unit");
   const filterForm = document.getElementById("filter-form");
   const clearFilterButton = document.getElementById("clear-filter");
   const conditionalFiltersDiv = document.getElementById("conditional-filters");
@@ -77,10 +81,14 @@ document.addEventListener("DOMContentLoaded", () => {
   const handleSubtypeSpecificFilters = () => {
     const selectedSubtype = subtypeSelect.value;
 
-    // Check for Residential Land
-    if (selectedSubtype === "residential_land") {
-      sqftRangeDiv.style.display = "none"; // Hide Sqft Range for Residential Land
-      bhkDiv.style.display = "none"; // Hide BHK options for Residential Land
+    // Land is filtered by plot area instead of square feet
+    const isLand = selectedSubtype === "residential_land" || selectedSubtype === "commercial_land";
+    plotAreaDiv.style.display = isLand ? "block" : "none";
+
+    // Check for Land
+    if (isLand) {
+      sqftRangeDiv.style.display = "none"; // Hide Sqft Range for land
+      bhkDiv.style.display = "none"; // Hide BHK options for land
     } else if (propertyTypeSelect.value === "commercial") {
       bhkDiv.style.display = "none"; // Hide BHK options for any commercial subtype
     } else {
@@ -99,6 +107,9 @@ document.addEventListener("DOMContentLoaded", () => {
     maxPriceInput.value = 10000000;
     minSqftInput.value = 500;
     maxSqftInput.value = 5000;
+    minPlotInput.value = "";
+    maxPlotInput.value = "";
+    plotAreaDiv.style.display = "none";
     priceDisplay.textContent = "0 - 10,000,000";
     sqftDisplay.textContent = "500 - 5000 sqft";
     conditionalFiltersDiv.style.display = "none";
@@ -145,10 +156,8 @@ document.addEventListener("DOMContentLoaded", () => {
 
   clearFilterButton.addEventListener("click", resetFilters);
 
-  filterForm.addEventListener("submit", (e) => {
-    e.preventDefault(); // Prevent default submission
-    
-    // Prepare the form data to be sent for filtering
+  // Section: Collect the Current Filter Values
+  const currentFilters = () => {
     const formData = {
       location: locationInput.value,
       property_type: propertyTypeSelect.value,
@@ -165,8 +174,60 @@ document.addEventListener("DOMContentLoaded", () => {
       formData.bhk = selectedBhk.value;
     }
 
+    if (plotAreaDiv.style.display !== "none") {
+      if (minPlotInput.value) formData.min_plot_area = minPlotInput.value;
+      if (maxPlotInput.value) formData.max_plot_area = maxPlotInput.value;
+      formData.plot_unit = plotUnitSelect.value;
+    }
+    return formData;
+  };
+
+  // Section: Facet Counts
+  // Show how many properties each choice would return, so empty results
+  // are visible before the filters are applied.
+  const applyButton = filterForm.querySelector('button[type="submit"]');
+  let facetTimer = null;
+
+  const showCount = (element, count) => {
+    if (!element) return;
+    if (!element.dataset.label) element.dataset.label = element.textContent.trim();
+    element.textContent =
+      count === undefined ? element.dataset.label : `${element.dataset.label} (${count})`;
+  };
+
+  const renderFacets = (facets) => {
+    propertyTypeSelect.querySelectorAll("option:not([value=''])").forEach((option) => {
+      showCount(option, facets.property_type[option.value]);
+    });
+    subtypeSelect.querySelectorAll("option:not([value=''])").forEach((option) => {
+      showCount(option, facets.property_subtype[option.value]);
+    });
+    bhkDiv.querySelectorAll('input[name="bhk"]').forEach((input) => {
+      showCount(document.querySelector(`label[for="${input.id}"]`), facets.bhk[input.value]);
+    });
+    showCount(applyButton, facets.total);
+  };
+
+  const updateFacets = () => {
+    clearTimeout(facetTimer);
+    facetTimer = setTimeout(() => {
+      const params = new URLSearchParams(currentFilters());
+      fetch(`/propertieslist/facets?${params}`)
+        .then((response) => response.json())
+        .then(renderFacets)
+        .catch(() => {});
+    }, 150);
+  };
+
+  filterForm.addEventListener("input", updateFacets);
+  filterForm.addEventListener("change", updateFacets);
+  clearFilterButton.addEventListener("click", updateFacets);
+
+  filterForm.addEventListener("submit", (e) => {
+    e.preventDefault(); // Prevent default submission
+
     // Dynamically generate the query string for the filter form
-    const queryString = new URLSearchParams(formData).toString();
+    const queryString = new URLSearchParams(currentFilters()).toString();
 
     // Redirect to the properties list page with the filters applied
     window.location.href = `/propertieslist/?${queryString}`;
@@ -174,4 +235,5 @@ document.addEventListener("DOMContentLoaded", () => {
 
   // Section: Initialize Property Filters
   updatePropertyTypes();
+  updateFacets();
 });
@@ -0,0 +1,40 @@
+// Fill the <datalist> of every input marked data-typeahead with suggestions
+// from the typeahead endpoint while the user types. The attribute value, if
+// any, limits the suggestions to "location" or "property".
+document.addEventListener("DOMContentLoaded", () => {
+  document.querySelectorAll("input[data-typeahead]").forEach((input) => {
+    const datalist = document.getElementById(input.getAttribute("list"));
+    const kind = input.dataset.typeahead;
+    let timer = null;
+    let controller = null;
+
+    const render = (results) => {
+      datalist.replaceChildren(
+        ...results.map(({ value }) => {
+          const option = document.createElement("option");
+          option.value = value;
+          return option;
+        })
+      );
+    };
+
+    input.addEventListener("input", () => {
+      clearTimeout(timer);
+      const query = input.value.trim();
+      if (!query) {
+        render([]);
+        return;
+      }
+      timer = setTimeout(() => {
+        if (controller) controller.abort();
+        controller = new AbortController();
+        const params = new URLSearchParams({ q: query });
+        if (kind) params.set("type", kind);
+        fetch(`/search/typeahead?${params}`, { signal: controller.signal })
+          .then((response) => response.json())
+          .then((data) => render(data.results))
+          .catch(() => {});
+      }, 120);
+    });
+  });
+});